@@ -1,25 +1,25 @@
 # main.py
 
 import customtkinter as ctk
-import requests
 import threading
-import base64
 import os
 import io
 import tempfile
 import shutil
 import atexit
 import multiprocessing
-import json
 import yaml
 from tkinter import filedialog, messagebox
-from collections import defaultdict
-from PIL import Image
 
 # Import locali dai moduli src
-from src.config import API_BASE_URL
-from src.ui_components import ToolTip, YamlEditorWindow
-from src.utils import format_hex_dump, start_open3d_process
+from src.ui_components import BatchDialog, HexViewer, ImagePanel, TextViewer, ToolTip, VirtualFileTree, YamlEditorWindow
+from src.utils import Open3DViewerWorker
+from src.image_cache import ThumbnailCache
+from src.config import ARCHIVE_MIN_FILES, DEFAULT_CONFIG_PATH
+from src.cache import DocumentCache
+from src.config_registry import ConfigRegistry
+from src.config_schema import ConfigValidationError
+from src.file_tree import FileTreeModel
 
 
 class App(ctk.CTk):
@@ -31,7 +31,16 @@ class App(ctk.CTk):
         ctk.set_default_color_theme("blue")
 
         self.temp_dir = tempfile.mkdtemp()
+        self.document_cache = DocumentCache()
+        self.config_registry = ConfigRegistry()
+        self.viewer_worker = Open3DViewerWorker()
+        self.thumbnail_cache = ThumbnailCache()
         atexit.register(self.cleanup)
+        # Creati al primo uso da _ensure_network(), fuori dal thread di Tk
+        self.file_fetcher = None
+        self.file_listing = None
+        self._network_lock = threading.Lock()
+        self._listing_cancel = None
 
         self._setup_main_layout()
         self._setup_ui_frames()
@@ -86,13 +95,26 @@ class App(ctk.CTk):
         self.generate_button.grid(row=0, column=0, padx=5, sticky="ew")
         self.regenerate_button = ctk.CTkButton(action_buttons_frame, text="Rigenera Dati", command=self.start_regeneration_thread)
         self.regenerate_button.grid(row=0, column=1, padx=5, sticky="ew")
+
+        # Avanzamento dei job in corso, visibile solo durante la generazione
+        self.generation_progress = ctk.CTkProgressBar(action_buttons_frame)
+        self.generation_progress.grid(row=1, column=0, padx=5, pady=(8, 0), sticky="ew")
+        self.cancel_generation_button = ctk.CTkButton(action_buttons_frame, text="Annulla", command=self.cancel_generation, fg_color="gray50", hover_color="gray40")
+        self.cancel_generation_button.grid(row=1, column=1, padx=5, pady=(8, 0), sticky="ew")
+        self.generation_progress.grid_remove()
+        self.cancel_generation_button.grid_remove()
+        self.active_jobs = set()
+        self.detached_jobs = set()  # Job rimasti sul server dopo aver perso il contatto: ancora annullabili
         
+        self.batch_button = ctk.CTkButton(gen_frame, text="Generazione Batch...", command=self.open_batch_dialog)
+        self.batch_button.grid(row=len(self.generation_options) + 2, column=0, columnspan=2, padx=10, pady=(5, 0), sticky="ew")
+
         self.edit_config_button = ctk.CTkButton(gen_frame, text="Modifica Configurazione ⚙️", command=self.open_config_editor, fg_color="#34568B", hover_color="#597aa2")
-        self.edit_config_button.grid(row=len(self.generation_options) + 2, column=0, columnspan=2, padx=10, pady=(5, 10), sticky="ew")
+        self.edit_config_button.grid(row=len(self.generation_options) + 3, column=0, columnspan=2, padx=10, pady=(5, 10), sticky="ew")
 
     def open_config_editor(self):
         """Apre la finestra dell'editor YAML."""
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+        config_path = DEFAULT_CONFIG_PATH
         if not os.path.exists(config_path):
             messagebox.showerror("Errore", f"File '{os.path.basename(config_path)}' non trovato.")
             return
@@ -106,6 +128,14 @@ class App(ctk.CTk):
         except Exception as e:
             messagebox.showerror("Errore Lettura YAML", f"Impossibile leggere il file config.yaml:\n{e}")
 
+    def open_batch_dialog(self):
+        """Apre la finestra per definire una generazione batch."""
+        if hasattr(self, 'batch_window') and self.batch_window.winfo_exists():
+            self.batch_window.focus()
+            return
+        from src.batch import EXAMPLE_BATCH_SPEC
+        self.batch_window = BatchDialog(self, EXAMPLE_BATCH_SPEC, self.start_batch_thread)
+
     def setup_fetching_frame(self):
         fetch_frame = ctk.CTkFrame(self.left_frame)
         fetch_frame.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
@@ -119,9 +149,9 @@ class App(ctk.CTk):
         refresh_button = ctk.CTkButton(header_frame, text="\u21BB", width=30, height=30, command=self.load_available_files, font=ctk.CTkFont(size=22), fg_color="transparent", hover_color=self.cget("fg_color"), text_color=("gray10", "gray90"))
         refresh_button.grid(row=0, column=1, sticky="e")
 
-        self.file_tree_frame = ctk.CTkScrollableFrame(fetch_frame, label_text="")
-        self.file_tree_frame.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
-        self.checkboxes = {}
+        self.file_tree_model = FileTreeModel()
+        self.file_tree_view = VirtualFileTree(fetch_frame, self.file_tree_model, on_selection_change=self._sync_select_all)
+        self.file_tree_view.grid(row=1, column=0, padx=10, pady=5, sticky="nsew")
 
         bottom_frame = ctk.CTkFrame(fetch_frame)
         bottom_frame.grid(row=2, column=0, padx=10, pady=10, sticky="ew")
@@ -150,7 +180,16 @@ class App(ctk.CTk):
         viewer_header.grid(row=0, column=0, padx=20, pady=(20, 10), sticky="ew")
         self.viewer_title = ctk.CTkLabel(viewer_header, text="Visualizzatore", font=ctk.CTkFont(size=18, weight="bold"))
         self.viewer_title.pack(side="left")
+        self.viewer_title_tooltip = ToolTip(self.viewer_title, "")  # Percorso completo e configurazione del file
         ctk.CTkButton(viewer_header, text="← Indietro", width=100, command=self.show_results_list).pack(side="right")
+        # Navigazione tra i file recuperati senza tornare alla lista
+        self.next_file_button = ctk.CTkButton(viewer_header, text="▶", width=35, command=lambda: self.show_adjacent_file(1))
+        self.next_file_button.pack(side="right", padx=(0, 10))
+        self.prev_file_button = ctk.CTkButton(viewer_header, text="◀", width=35, command=lambda: self.show_adjacent_file(-1))
+        self.prev_file_button.pack(side="right", padx=(0, 5))
+        self.viewer_items = []
+        self.viewer_index = -1
+        self._viewer_token = 0
         self.viewer_content_frame = ctk.CTkFrame(self.viewer_frame, fg_color="transparent")
         self.viewer_content_frame.grid(row=1, column=0, padx=20, pady=(0, 20), sticky="nsew")
         
@@ -163,166 +202,271 @@ class App(ctk.CTk):
         threading.Thread(target=self.generate_scene_logic, args=(True,), daemon=True).start()
 
     def generate_scene_logic(self, is_regenerate=False):
-        endpoint = "/regenerate_data" if is_regenerate else "/generate_scene"
+        import requests
+        from src import client
+        from src.jobs import TERMINAL_STATES
+
         button = self.regenerate_button if is_regenerate else self.generate_button
         button_text = "Rigenera Dati" if is_regenerate else "Genera Scena"
+        label = "Rigenerazione" if is_regenerate else "Generazione"
         
-        self.after(0, button.configure, {"state": "disabled", "text": "In corso..."})
-        self.after(0, self.update_status, f"{'Rigenerazione' if is_regenerate else 'Generazione'} in corso...")
+        self.after(0, lambda: button.configure(state="disabled", text="In corso..."))
+        self.after(0, self.update_status, f"{label} in corso...")
         
+        selected_options = [name for name, var in self.generation_options.items() if var.get()]
+        config_path = DEFAULT_CONFIG_PATH
+        try:
+            job = client.create_generation_job(selected_options, is_regenerate=is_regenerate, config_path=config_path, registry=self.config_registry)
+        except ConfigValidationError as e:
+            self.after(0, self._show_config_errors, e)
+            self.after(0, lambda: button.configure(state="normal", text=button_text))
+            return
+        except ValueError as e:
+            self.after(0, self.update_status, f"Errore: {e}")
+            self.after(0, lambda: button.configure(state="normal", text=button_text))
+            return
+        if not is_regenerate:
+            if os.path.exists(config_path): self.after(0, self.update_status, "Generazione con config.yaml...")
+            else: self.after(0, self.update_status, "Info: config.yaml non trovato, procedo senza.")
+
+        self.after(0, self._on_generation_started, job)
+        last_images_done = 0
+
+        def on_progress(status):
+            nonlocal last_images_done
+            self.after(0, self._show_generation_progress, label, status)
+            # Aggiorna la lista file (in modo incrementale) man mano che arrivano nuove immagini
+            if status["images_done"] > last_images_done:
+                last_images_done = status["images_done"]
+                self.after(0, self.load_available_files)
+
+        try:
+            status = job.run(progress_callback=on_progress)
+            if status["state"] == "cancelled":
+                self.after(0, self.update_status, f"{label} annullata.")
+            else:
+                reuse_note = " (config già presente sul server, upload evitato)" if job.config_hash and not job.config_uploaded else ""
+                self.after(0, self.update_status, f"Operazione completata con successo{reuse_note}.")
+            self.after(0, self.load_available_files)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if job.job_id is not None and job.state not in TERMINAL_STATES:
+                # Il job potrebbe essere ancora in esecuzione: resta annullabile
+                self.detached_jobs.add(job)
+                self.after(0, self.update_status, f"{e}. Usare Annulla per interrompere il job {job.job_id}.")
+            else:
+                self.after(0, self.update_status, f"Errore di connessione: {e}")
+        finally:
+            if job not in self.detached_jobs:
+                self.after(0, self._on_generation_finished, job)
+            self.after(0, lambda: button.configure(state="normal", text=button_text))
+
+    def start_batch_thread(self, spec):
+        threading.Thread(target=self.batch_generation_logic, args=(spec,), daemon=True).start()
+
+    def batch_generation_logic(self, spec):
+        from src import client
+
         selected_options = [name for name, var in self.generation_options.items() if var.get()]
         if not selected_options:
             self.after(0, self.update_status, "Errore: Selezionare almeno un'opzione.")
-            self.after(0, button.configure, {"state": "normal", "text": button_text})
             return
 
         try:
-            config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
-            if not is_regenerate and os.path.exists(config_path):
-                self.after(0, self.update_status, "Generazione con config.yaml...")
-                payload = {'options': json.dumps(selected_options)}
-                with open(config_path, 'rb') as config_file_obj:
-                    files = {'config_file': ('config.yaml', config_file_obj, 'application/x-yaml')}
-                    response = requests.post(f"{API_BASE_URL}{endpoint}", data=payload, files=files, timeout=60)
-            else:
-                if not is_regenerate: self.after(0, self.update_status, "Info: config.yaml non trovato, procedo senza.")
-                response = requests.post(f"{API_BASE_URL}{endpoint}", json={"options": selected_options}, timeout=60)
-            
-            response.raise_for_status()
-            self.after(0, self.update_status, "Operazione completata con successo.")
+            queue = client.create_batch(selected_options, spec, registry=self.config_registry)
+        except ConfigValidationError as e:
+            self.after(0, self._show_config_errors, e)
+            return
+        except (OSError, ValueError, TypeError, IndexError, yaml.YAMLError) as e:
+            self.after(0, self.update_status, f"Errore nella specifica del batch: {e}")
+            return
+
+        self.after(0, self._on_generation_started, queue)
+        self.after(0, lambda: self.batch_button.configure(state="disabled"))
+        attribution_note = (" Con più job contemporanei i file vengono collegati alla configurazione solo se il server ne riporta l'elenco."
+                            if queue.max_in_flight > 1 else "")
+        self.after(0, self.update_status, f"Batch avviato: {len(queue.configs)} scene, {queue.max_in_flight} alla volta...{attribution_note}")
+
+        def on_progress(status):
+            self.after(0, self._show_batch_progress, status)
             self.after(0, self.load_available_files)
-        except requests.exceptions.RequestException as e:
-            self.after(0, self.update_status, f"Errore di connessione: {e}")
+
+        try:
+            status = queue.run(progress_callback=on_progress)
+            outcome = "annullato" if queue.cancelled else "completato"
+            self.after(0, self.update_status, f"Batch {outcome}: {status['completed']}/{status['total']} scene, {status['failed']} fallite, {status['scenes_per_minute']:.2f} scene/min.")
         finally:
-            self.after(0, button.configure, {"state": "normal", "text": button_text})
+            self.after(0, self._on_generation_finished, queue)
+            self.after(0, lambda: self.batch_button.configure(state="normal"))
+
+    def _show_config_errors(self, error):
+        self.update_status(f"Configurazione non valida: {len(error.errors)} errori, richiesta non inviata.")
+        messagebox.showerror("Configurazione non valida", f"Correggere config.yaml prima di inviare la richiesta:\n\n{error}")
+
+    def _show_batch_progress(self, status):
+        finished = status["completed"] + status["failed"]
+        self.generation_progress.set(finished / status["total"])
+        self.update_status(f"Batch: {status['completed']}/{status['total']} scene ({status['failed']} fallite), {status['scenes_per_minute']:.2f} scene/min")
+
+    def _on_generation_started(self, job):
+        self.active_jobs.add(job)
+        self.generation_progress.set(0)
+        self.generation_progress.grid()
+        self.cancel_generation_button.grid()
+
+    def _on_generation_finished(self, job):
+        self.active_jobs.discard(job)
+        if not self.active_jobs:
+            self.generation_progress.grid_remove()
+            self.cancel_generation_button.grid_remove()
+
+    def _show_generation_progress(self, label, status):
+        done, total = status["images_done"], status["images_total"]
+        if status.get("poll_failures"):
+            self.update_status(f"{label}: {status['message']}...")
+        elif total:
+            self.generation_progress.set(min(1.0, done / total))
+            self.update_status(f"{label}: {done}/{total} immagini ({status['state']})...")
+        else:
+            self.update_status(f"{label}: {status['state']}...")
+
+    def cancel_generation(self):
+        """Annulla i job di generazione in corso."""
+        for job in list(self.active_jobs):
+            threading.Thread(target=self._cancel_job, args=(job,), daemon=True).start()
+        self.update_status("Annullamento in corso...")
+
+    def _cancel_job(self, job):
+        if job.cancel() is False:
+            self.after(0, self.update_status, job.message)
+        elif job in self.detached_jobs:
+            # Nessun worker segue più questo job: si chiude qui
+            self.detached_jobs.discard(job)
+            self.after(0, self._on_generation_finished, job)
 
     def start_get_files_thread(self):
-        threading.Thread(target=self.get_all_files_logic, daemon=True).start()
-
-    def get_all_files_logic(self):
-        selected_files = [filename for filename, checkbox in self.checkboxes.items() if checkbox.get() == 1]
+        selected_files = self.file_tree_model.selected_files()
+        # Un'intera cartella con molti file viene scaricata come unico archivio
+        archive_folder = None
+        if len(selected_files) >= ARCHIVE_MIN_FILES:
+            archive_folder = self.file_tree_model.covering_folder(selected_files)
+        threading.Thread(target=self.get_all_files_logic, args=(selected_files, archive_folder), daemon=True).start()
+
+    def get_all_files_logic(self, selected_files, archive_folder=None):
         if not selected_files:
             self.update_status("Nessun file selezionato.")
             return
 
+        import requests
+        from src.network import format_transfer_summary, summarize_transfers
+        self._ensure_network()
         self.after(0, self.get_files_button.configure, {"state": "disabled", "text": "Recuperando..."})
         if len(selected_files) == 1:
             filename = selected_files[0]
             self.update_status(f"Recuperando file: {filename}...")
             try:
                 details = self._fetch_file_details(filename)
+                self.viewer_items = [(filename, details)]
                 self.after(0, lambda: self.open_viewer_in_frame(filename, details))
                 self.after(0, self.update_status, f"Visualizzazione di: {filename}")
-            except requests.exceptions.RequestException as e:
+            except (requests.exceptions.RequestException, OSError, ValueError) as e:
                 self.after(0, self.update_status, f"Errore nel recuperare {filename}: {e}")
                 self.after(0, self.display_results, {"files": {}, "errors": {filename: str(e)}})
             finally:
                 self.after(0, self.get_files_button.configure, {"state": "normal", "text": "Fetch Dati Selezionati"})
         else:
-            self.update_status(f"Recupero di {len(selected_files)} file...")
-            files_found, errors = {}, {}
-            for i, filename in enumerate(selected_files, 1):
-                self.update_status(f"Recuperando {i}/{len(selected_files)}: {filename}...")
-                try:
-                    files_found[filename] = self._fetch_file_details(filename)
-                except requests.exceptions.RequestException as e:
-                    errors[filename] = str(e)
-                self.update_idletasks()
+            self.after(0, self.update_status, f"Recupero di {len(selected_files)} file...")
+
+            def on_progress(done, total, filename, error):
+                prefix = "Errore" if error else "Recuperato"
+                self.after(0, self.update_status, f"{prefix} {done}/{total}: {filename}")
+
+            if archive_folder:
+                results = self.file_fetcher.fetch_tree(archive_folder, selected_files, progress_callback=on_progress)
+            else:
+                results = self.file_fetcher.fetch_many(selected_files, progress_callback=on_progress)
+            files_found, errors = results["files"], results["errors"]
+            from_cache = sum(1 for details in files_found.values() if details.get("cached"))
+            transfers = summarize_transfers(files_found.values())
             
-            self.after(0, self.display_results, {"files": files_found, "errors": errors})
+            self.after(0, self.display_results, results)
             self.after(0, self.get_files_button.configure, {"state": "normal", "text": "Fetch Dati Selezionati"})
-            final_message = f"Recuperati {len(files_found)} file." + (f" Falliti: {len(errors)}." if errors else "")
+            final_message = f"Recuperati {len(files_found)} file" + (f" ({from_cache} dalla cache)." if from_cache else ".") + (f" Falliti: {len(errors)}." if errors else "")
+            if results.get("archive_error"):
+                final_message += f" {results['archive_error']}"
+            if transfers["files"]:
+                final_message += f" Rete: {format_transfer_summary(transfers)}."
             self.after(0, self.update_status, final_message)
 
     def _fetch_file_details(self, filename):
-        response = requests.get(f"{API_BASE_URL}/get_document/{filename}", timeout=30)
-        response.raise_for_status()
-        ext = filename.lower().split('.')[-1]
-        mime_types = {'png': 'image/png', 'jpg': 'image/jpeg', 'txt': 'text/plain', 'json': 'application/json'}
-        return {
-            "data": base64.b64encode(response.content).decode('utf-8'),
-            "mime_type": mime_types.get(ext, 'application/octet-stream')
-        }
-
-    def build_file_tree(self, file_paths):
-        tree = lambda: defaultdict(tree)
-        file_tree = tree()
-        for path in file_paths:
-            parts = path.split('/')
-            node = file_tree
-            for part in parts[:-1]:
-                node = node[part]
-            node[parts[-1]] = None
-        return file_tree
-
-    def populate_tree_view(self, parent_widget, tree, indent=0, current_path=""):
-        sorted_items = sorted(tree.items(), key=lambda x: (isinstance(x[1], defaultdict), x[0]))
-        for name, content in sorted_items:
-            full_path = os.path.join(current_path, name).replace("\\", "/")
-            is_folder = isinstance(content, defaultdict)
-            item_frame = ctk.CTkFrame(parent_widget, fg_color="transparent")
-            item_frame.pack(fill="x", anchor="w")
-            if is_folder:
-                self.create_folder_node(item_frame, name, content, indent, full_path)
-            else:
-                self.create_file_node(item_frame, name, indent, full_path)
-
-    def create_folder_node(self, parent_frame, name, content, indent, full_path):
-        row_frame = ctk.CTkFrame(parent_frame, fg_color="transparent")
-        row_frame.pack(fill="x")
-        children_frame = ctk.CTkFrame(parent_frame, fg_color="transparent")
-        
-        toggle_button = ctk.CTkButton(row_frame, text="▶", width=25, fg_color="transparent", text_color=("gray10", "gray90"), command=lambda b=row_frame, cf=children_frame: self.toggle_folder(b, cf))
-        toggle_button.pack(side="left", padx=(indent * 20, 5))
-        
-        folder_label = ctk.CTkLabel(row_frame, text=f"📁  {self.truncate_text(name)}", anchor="w")
-        folder_label.pack(side="left", fill="x", expand=True)
-        if len(name) > 40: ToolTip(folder_label, name)
-        
-        self.populate_tree_view(children_frame, content, indent + 1, full_path)
-    
-    def toggle_folder(self, button, children_frame):
-        btn = button.winfo_children()[0] # Get the actual button widget
-        if children_frame.winfo_viewable():
-            children_frame.pack_forget()
-            btn.configure(text="▶")
-        else:
-            children_frame.pack(fill="x", after=button)
-            btn.configure(text="▼")
-
-    def create_file_node(self, parent_frame, name, indent, full_path):
-        checkbox = ctk.CTkCheckBox(parent_frame, text=f"  📄 {self.truncate_text(name)}")
-        checkbox.pack(fill="x", padx=(indent * 20 + 30, 5), pady=2)
-        if len(name) > 40: ToolTip(checkbox, name)
-        self.checkboxes[full_path] = checkbox
+        return self.file_fetcher.fetch_one(filename)
 
     def truncate_text(self, text, max_len=40):
         return (text[:max_len-3] + "...") if len(text) > max_len else text
 
     def load_available_files(self):
-        for widget in self.file_tree_frame.winfo_children(): widget.destroy()
-        self.checkboxes.clear()
-        self.select_all_var.set(0)
+        """
+        Avvia l'aggiornamento della lista file in un thread di background.
+        Un nuovo aggiornamento annulla quello eventualmente ancora in corso.
+        """
+        if self._listing_cancel is not None:
+            self._listing_cancel.set()
+        cancel_event = threading.Event()
+        self._listing_cancel = cancel_event
+
         self.update_status("Aggiornamento lista file...")
+        if not self.file_tree_model.files:
+            self.file_tree_view.show_message("Caricamento lista file...")
+        threading.Thread(target=self._load_files_worker, args=(cancel_event,), daemon=True).start()
+
+    def _ensure_network(self):
+        """
+        Importa i moduli di rete (requests e dipendenze) e crea listing e fetcher
+        al primo uso. Viene chiamato dai thread di background, così l'import non
+        ritarda la comparsa della finestra.
+        """
+        with self._network_lock:
+            if self.file_listing is None:
+                from src.network import FileFetcher, FileListing
+                self.file_fetcher = FileFetcher(self.temp_dir, cache=self.document_cache)
+                self.file_listing = FileListing()
+
+    def _load_files_worker(self, cancel_event):
+        import requests
         try:
-            response = requests.get(f"{API_BASE_URL}/list_files", timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            if data.get("status") == "success":
-                files = data.get("files", [])
-                self.get_files_button.configure(state="normal")
-                self.select_all_checkbox.configure(state="normal" if files else "disabled")
-                if not files:
-                    ctk.CTkLabel(self.file_tree_frame, text="Nessun file sul server.").pack(padx=10, pady=10)
-                    self.update_status("Nessun file trovato sul server.")
-                    return
-                file_tree = self.build_file_tree(files)
-                self.populate_tree_view(self.file_tree_frame, file_tree)
-                self.update_status(f"Trovati {len(files)} file sul server.")
-            else:
-                raise requests.exceptions.RequestException(f"Errore API: {data.get('message')}")
-        except requests.exceptions.RequestException as e:
-            ctk.CTkLabel(self.file_tree_frame, text="❌ Server non raggiungibile.", text_color="gray50").pack(padx=10, pady=10)
+            self._ensure_network()
+            result, error = self.file_listing.fetch(), None
+        except (requests.exceptions.RequestException, ValueError) as e:
+            result, error = None, e
+        if not cancel_event.is_set():
+            self.after(0, self._apply_file_listing, cancel_event, result, error)
+
+    def _apply_file_listing(self, cancel_event, result, error):
+        """Applica il listing ricevuto; eseguito sul thread di Tk."""
+        import requests
+        if cancel_event.is_set():
+            return
+        self._listing_cancel = None
+        try:
+            if error is not None:
+                raise error
+            delta = self.file_listing.apply(result)
+            files = delta["files"]
+            self.file_tree_model.apply_delta(delta["added"], delta["removed"])
+            self._sync_select_all()
+            if delta["added"] and not delta["baseline"]:
+                # Il primo listing contiene anche i file preesistenti: si attribuiscono solo le novità
+                self.config_registry.attribute_outputs(delta["added"])
+            self.get_files_button.configure(state="normal")
+            self.select_all_checkbox.configure(state="normal" if files else "disabled")
+            if not files:
+                self.file_tree_view.show_message("Nessun file sul server.")
+                self.update_status("Nessun file trovato sul server.")
+                return
+            self.file_tree_view.refresh()
+            changes = f" (+{len(delta['added'])} / -{len(delta['removed'])})" if delta["added"] or delta["removed"] else ""
+            self.update_status(f"Trovati {len(files)} file sul server{changes}.")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.file_tree_view.show_message("❌ Server non raggiungibile.")
             self.get_files_button.configure(state="disabled")
             self.select_all_checkbox.configure(state="disabled")
             self.update_status(f"Server non raggiungibile: {e}")
@@ -330,6 +474,7 @@ class App(ctk.CTk):
     def display_results(self, data):
         for widget in self.results_scroll_frame.winfo_children(): widget.destroy()
         files_found, errors = data.get("files", {}), data.get("errors", {})
+        self.viewer_items = list(files_found.items())
         for filename, details in files_found.items():
             self.create_result_card(filename, details, success=True)
         for filename, message in errors.items():
@@ -352,20 +497,34 @@ class App(ctk.CTk):
                 ctk.CTkLabel(info_frame, text=f"In: {self.truncate_text(path_part, 45)}", anchor="w", font=ctk.CTkFont(size=11, slant="italic"), text_color="gray60").pack(fill="x")
             ctk.CTkLabel(info_frame, text=f"- {self.truncate_text(name_part, 50)}", anchor="w", font=ctk.CTkFont(weight="bold")).pack(fill="x")
             ctk.CTkButton(buttons_frame, text="Visualizza", width=100, command=lambda f=filename, d=details: self.open_viewer_in_frame(f, d)).pack(side="right", padx=(5,0))
-            ctk.CTkButton(buttons_frame, text="Salva", width=80, fg_color="#17a2b8", hover_color="#138496", command=lambda f=filename, d=details['data']: self.save_file_dialog(f, d)).pack(side="right")
+            ctk.CTkButton(buttons_frame, text="Salva", width=80, fg_color="#17a2b8", hover_color="#138496", command=lambda f=filename, p=details['path']: self.save_file_dialog(f, p)).pack(side="right")
         else:
             ctk.CTkLabel(info_frame, text=f"❌ {self.truncate_text(filename, 50)}", anchor="w", font=ctk.CTkFont(weight="bold")).pack(fill="x")
             ctk.CTkLabel(info_frame, text=details['message'], text_color="gray60", anchor="w").pack(fill="x")
 
+    def show_adjacent_file(self, step):
+        """Apre il file precedente o successivo tra quelli recuperati."""
+        if not self.viewer_items:
+            return
+        self.viewer_index = (self.viewer_index + step) % len(self.viewer_items)
+        self.open_viewer_in_frame(*self.viewer_items[self.viewer_index])
+
     def open_viewer_in_frame(self, filename, details):
+        self._viewer_token += 1
+        names = [name for name, _ in self.viewer_items]
+        self.viewer_index = names.index(filename) if filename in names else -1
+        navigation_state = "normal" if len(self.viewer_items) > 1 else "disabled"
+        self.prev_file_button.configure(state=navigation_state)
+        self.next_file_button.configure(state=navigation_state)
         for widget in self.viewer_content_frame.winfo_children(): widget.destroy()
         self.viewer_title.configure(text=f"Visualizzatore: {self.truncate_text(filename, 50)}")
-        if len(filename) > 50: ToolTip(self.viewer_title, filename)
+        config_hash = self.config_registry.config_for_file(filename)
+        tooltip_lines = []
+        if len(filename) > 50 or config_hash:
+            tooltip_lines = [filename] + ([f"Configurazione: {self.config_registry.config_path(config_hash)}"] if config_hash else [])
+        self.viewer_title_tooltip.set_text("\n".join(tooltip_lines))
         
-        file_bytes = base64.b64decode(details['data'])
-        temp_file_path = os.path.join(self.temp_dir, filename.replace("/", os.sep))
-        os.makedirs(os.path.dirname(temp_file_path), exist_ok=True)
-        with open(temp_file_path, 'wb') as f: f.write(file_bytes)
+        temp_file_path = details['path']
         
         self.show_viewer()
         self.viewer_content_frame.update_idletasks()
@@ -373,48 +532,104 @@ class App(ctk.CTk):
         file_ext = filename.lower().split('.')[-1]
         mime_type = details.get('mime_type', 'application/octet-stream')
 
-        if file_ext in ['npy', 'pcd']:
-            self.display_message_in_viewer(f"Apertura visualizzatore 3D per '{filename}'...")
-            start_open3d_process(temp_file_path)
+        annotator_kind = None
+        if file_ext == 'npy':
+            from src.annotators import detect_annotator_kind
+            annotator_kind = detect_annotator_kind(filename, temp_file_path)
+        if annotator_kind: self.display_annotator(temp_file_path, annotator_kind)
+        elif file_ext in ['npy', 'pcd']: self.display_point_cloud(temp_file_path)
         elif mime_type.startswith('image/'): self.display_image(temp_file_path)
         elif mime_type.startswith('text/') or 'json' in mime_type: self.display_text(temp_file_path)
         else: self.display_binary(temp_file_path)
 
-    def display_image(self, image_path):
-        try:
-            pil_image = Image.open(image_path)
-            container_width, container_height = self.viewer_content_frame.winfo_width() - 20, self.viewer_content_frame.winfo_height() - 20
-            if container_width <= 1 or container_height <= 1:
-                self.after(50, lambda: self.display_image(image_path))
-                return
-            
-            image_copy = pil_image.copy()
-            image_copy.thumbnail((container_width, container_height), Image.Resampling.LANCZOS)
-            ctk_image = ctk.CTkImage(light_image=image_copy, dark_image=image_copy, size=image_copy.size)
-            ctk.CTkLabel(self.viewer_content_frame, text="", image=ctk_image).pack(padx=10, pady=10, expand=True)
-        except Exception as e:
-            self.display_message_in_viewer(f"Errore caricamento immagine:\n{e}")
+    def display_image(self, image_path, container=None):
+        container = container or self.viewer_content_frame
+        ImagePanel(container, image_path, self.thumbnail_cache).pack(expand=True, fill="both")
+
+    def display_point_cloud(self, file_path, view="top"):
+        """
+        Mostra una proiezione 2D della nuvola di punti, generata in background
+        e salvata in cache; la finestra Open3D si apre solo su richiesta.
+        """
+        from src.pointcloud import PROJECTION_VIEWS
+        from src.previews import point_cloud_thumbnail
 
-    def create_textbox_viewer(self, file_path, is_binary=False):
         for widget in self.viewer_content_frame.winfo_children(): widget.destroy()
-        textbox = ctk.CTkTextbox(self.viewer_content_frame, font=("Consolas", 12), wrap="none")
-        textbox.pack(expand=True, fill="both")
-        
-        content = ""
-        if is_binary:
-            with open(file_path, 'rb') as f:
-                content = format_hex_dump(f.read())
-        else:
+        toolbar = ctk.CTkFrame(self.viewer_content_frame, fg_color="transparent")
+        toolbar.pack(fill="x")
+        view_selector = ctk.CTkSegmentedButton(toolbar, values=list(PROJECTION_VIEWS), command=lambda v: self.display_point_cloud(file_path, v))
+        view_selector.set(view)
+        view_selector.pack(side="left")
+        ctk.CTkButton(toolbar, text="Apri in 3D", width=100, command=lambda: self.viewer_worker.show(file_path)).pack(side="right")
+
+        preview_frame = ctk.CTkFrame(self.viewer_content_frame, fg_color="transparent")
+        preview_frame.pack(expand=True, fill="both")
+        status_label = ctk.CTkLabel(preview_frame, text="Rendering anteprima...", text_color="gray60")
+        status_label.pack(padx=20, pady=20, expand=True)
+
+        token = self._viewer_token
+
+        def render():
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    raw_content = f.read()
-                try: content = json.dumps(json.loads(raw_content), indent=4) # Pretty-print JSON
-                except (json.JSONDecodeError, TypeError): content = raw_content
+                thumbnail_path, error = point_cloud_thumbnail(file_path, view=view), None
             except Exception as e:
-                content = f"Errore lettura file: {e}"
-        
-        textbox.insert("1.0", content)
-        textbox.configure(state="disabled")
+                thumbnail_path, error = None, e
+            self.after(0, show, thumbnail_path, error)
+
+        def show(thumbnail_path, error):
+            if token != self._viewer_token or not preview_frame.winfo_exists():
+                return  # L'utente è già passato a un altro file
+            status_label.destroy()
+            if error is not None:
+                ctk.CTkLabel(preview_frame, text=f"Anteprima non disponibile:\n{error}", text_color="gray60").pack(padx=20, pady=20, expand=True)
+            else:
+                self.display_image(thumbnail_path, container=preview_frame)
+
+        threading.Thread(target=render, daemon=True).start()
+
+    def display_annotator(self, file_path, kind):
+        """
+        Mostra una mappa di profondità o di segmentazione come immagine colorata,
+        con le statistiche principali sotto; la conversione avviene in background.
+        """
+        from src.annotators import format_annotator_stats
+        from src.previews import annotator_preview
+
+        for widget in self.viewer_content_frame.winfo_children(): widget.destroy()
+        preview_frame = ctk.CTkFrame(self.viewer_content_frame, fg_color="transparent")
+        preview_frame.pack(expand=True, fill="both")
+        status_label = ctk.CTkLabel(preview_frame, text="Elaborazione immagine...", text_color="gray60")
+        status_label.pack(padx=20, pady=20, expand=True)
+
+        token = self._viewer_token
+
+        def render():
+            try:
+                result, error = annotator_preview(file_path, kind), None
+            except Exception as e:
+                result, error = None, e
+            self.after(0, show, result, error)
+
+        def show(result, error):
+            if token != self._viewer_token or not preview_frame.winfo_exists():
+                return
+            status_label.destroy()
+            if error is not None:
+                ctk.CTkLabel(preview_frame, text=f"Anteprima non disponibile:\n{error}", text_color="gray60").pack(padx=20, pady=20, expand=True)
+                return
+            thumbnail_path, stats = result
+            ctk.CTkLabel(preview_frame, text=format_annotator_stats(kind, stats), text_color="gray70", wraplength=600).pack(side="bottom", fill="x", pady=(5, 0))
+            self.display_image(thumbnail_path, container=preview_frame)
+
+        threading.Thread(target=render, daemon=True).start()
+
+    def create_textbox_viewer(self, file_path, is_binary=False):
+        for widget in self.viewer_content_frame.winfo_children(): widget.destroy()
+        try:
+            viewer_class = HexViewer if is_binary else TextViewer
+            viewer_class(self.viewer_content_frame, file_path).pack(expand=True, fill="both")
+        except (OSError, ValueError) as e:
+            self.display_message_in_viewer(f"Errore lettura file: {e}")
 
     def display_text(self, text_path): self.create_textbox_viewer(text_path)
     def display_binary(self, file_path): self.create_textbox_viewer(file_path, is_binary=True)
@@ -422,10 +637,13 @@ class App(ctk.CTk):
         for widget in self.viewer_content_frame.winfo_children(): widget.destroy()
         ctk.CTkLabel(self.viewer_content_frame, text=message, font=ctk.CTkFont(size=14)).pack(padx=20, pady=20, expand=True)
 
+    def _sync_select_all(self):
+        """Allinea la casella "Tutti" alla selezione del modello (che sopravvive ai refresh)."""
+        self.select_all_var.set(1 if self.file_tree_model.all_selected() else 0)
+
     def toggle_select_all(self):
-        is_checked = self.select_all_var.get()
-        for checkbox in self.checkboxes.values():
-            checkbox.select() if is_checked else checkbox.deselect()
+        self.file_tree_model.select_all(self.select_all_var.get() == 1)
+        self.file_tree_view.refresh()
 
     def show_viewer(self):
         self.results_list_frame.grid_forget()
@@ -435,14 +653,12 @@ class App(ctk.CTk):
         self.viewer_frame.grid_forget()
         self.results_list_frame.grid(row=0, column=0, sticky="nsew")
 
-    def save_file_dialog(self, filename, base64_data):
+    def save_file_dialog(self, filename, source_path):
         try:
-            file_bytes = base64.b64decode(base64_data)
             save_path = filedialog.asksaveasfilename(initialfile=os.path.basename(filename), title=f"Salva {filename}")
             if save_path:
                 os.makedirs(os.path.dirname(save_path), exist_ok=True)
-                with open(save_path, 'wb') as f:
-                    f.write(file_bytes)
+                shutil.copyfile(source_path, save_path)
                 self.update_status(f"File '{os.path.basename(filename)}' salvato.")
         except Exception as e:
             self.update_status(f"Errore salvataggio: {e}")
@@ -451,6 +667,11 @@ class App(ctk.CTk):
         self.status_label.configure(text=message)
 
     def cleanup(self):
+        self.viewer_worker.shutdown()
+        if self.file_fetcher is not None:
+            self.file_fetcher.release()  # Le voci fissate dall'ultimo fetch tornano soggette al limite
+        self.document_cache.save()
+        self.config_registry.save()
         if os.path.isdir(self.temp_dir):
             shutil.rmtree(self.temp_dir)
             print(f"Directory temporanea {self.temp_dir} rimossa.")
@@ -0,0 +1,140 @@
+# src/annotators.py
+
+"""
+Modulo per la visualizzazione degli output del replicator salvati come .npy:
+mappe di profondità (distance_to_image_plane, distance_to_camera) e
+segmentazione per istanze. Tutte le conversioni sono vettorizzate con NumPy.
+"""
+
+import os
+
+import numpy as np
+
+DEPTH_NAME_HINTS = ("distance_to_image_plane", "distance_to_camera", "depth")
+SEGMENTATION_NAME_HINTS = ("instance_segmentation", "semantic_segmentation", "instance_id_segmentation")
+
+
+def _turbo_lut():
+    """Colormap 'turbo' (approssimazione polinomiale) come tabella 256x3 uint8."""
+    x = np.linspace(0.0, 1.0, 256)
+    r = 0.13572138 + x * (4.61539260 + x * (-42.66032258 + x * (132.13108234 + x * (-152.94239396 + x * 59.28637943))))
+    g = 0.09140261 + x * (2.19418839 + x * (4.84296658 + x * (-14.18503333 + x * (4.27729857 + x * 2.82956604))))
+    b = 0.10667330 + x * (12.64194608 + x * (-60.58204836 + x * (110.36276771 + x * (-89.90310912 + x * 27.34824973))))
+    return (np.clip(np.stack([r, g, b], axis=1), 0.0, 1.0) * 255).astype(np.uint8)
+
+
+TURBO_LUT = _turbo_lut()
+
+
+def detect_annotator_kind(filename, file_path):
+    """
+    Restituisce "depth", "segmentation" o None per un file .npy.
+    Il nome del file ha la precedenza; altrimenti si guarda la forma dell'array
+    (letta dall'header, senza caricare i dati): le immagini sono (H, W) o (H, W, 1),
+    mentre le nuvole di punti sono (N, 3..9).
+    """
+    name = os.path.basename(filename).lower()
+    if any(hint in name for hint in SEGMENTATION_NAME_HINTS):
+        return "segmentation"
+    if any(hint in name for hint in DEPTH_NAME_HINTS):
+        return "depth"
+    try:
+        array = np.load(file_path, mmap_mode='r', allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+    is_image = (array.ndim == 2 and array.shape[1] > 9) or (array.ndim == 3 and array.shape[2] == 1)
+    if not is_image:
+        return None
+    return "segmentation" if np.issubdtype(array.dtype, np.integer) else "depth"
+
+
+def _as_image_array(file_path):
+    array = np.load(file_path, mmap_mode='r', allow_pickle=False)
+    if array.ndim == 3 and array.shape[2] == 1:
+        array = array[:, :, 0]
+    if array.ndim != 2:
+        raise ValueError(f"Attesa un'immagine 2D, trovata forma {array.shape}.")
+    return array
+
+
+def colorize_depth(depth, low_percentile=2.0, high_percentile=98.0):
+    """
+    Converte una mappa di profondità in RGB uint8 con la colormap turbo.
+    L'intervallo è dato dai percentili dei pixel validi (finiti e > 0), calcolati
+    con una sola chiamata; i pixel non validi (es. sfondo a infinito) sono neri.
+    Restituisce (immagine, statistiche).
+    """
+    depth = np.asarray(depth, dtype=np.float32)
+    valid = np.isfinite(depth) & (depth > 0)
+    values = depth[valid]
+    image = np.zeros(depth.shape + (3,), dtype=np.uint8)
+    stats = {"valid_fraction": float(valid.mean()) if depth.size else 0.0}
+    if values.size == 0:
+        return image, stats
+
+    low, high = np.percentile(values, [low_percentile, high_percentile])
+    scale = 255.0 / max(float(high - low), 1e-6)
+    indices = np.clip((values - low) * scale, 0, 255).astype(np.uint8)
+    image[valid] = TURBO_LUT[indices]
+    stats.update({
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": float(values.mean()),
+        "range_low": float(low),
+        "range_high": float(high),
+    })
+    return image, stats
+
+
+def segmentation_palette(ids):
+    """Colori pseudo-casuali ma stabili per ogni id (0 = sfondo nero)."""
+    ids = np.asarray(ids, dtype=np.uint64)
+    hashed = (ids * np.uint64(2654435761)) & np.uint64(0xFFFFFF)
+    colors = np.stack([(hashed >> np.uint64(16)) & np.uint64(0xFF),
+                       (hashed >> np.uint64(8)) & np.uint64(0xFF),
+                       hashed & np.uint64(0xFF)], axis=1).astype(np.uint8)
+    colors |= 0x40  # evita colori troppo scuri, confondibili con lo sfondo
+    colors[ids == 0] = 0
+    return colors
+
+
+def colorize_segmentation(ids, top_n=5):
+    """
+    Converte una mappa di id di istanza in RGB uint8 con una tabella colori
+    calcolata solo sugli id presenti. Restituisce (immagine, statistiche).
+    """
+    ids = np.asarray(ids)
+    unique_ids, inverse, counts = np.unique(ids, return_inverse=True, return_counts=True)
+    image = segmentation_palette(unique_ids)[inverse.reshape(ids.shape)]
+    foreground = unique_ids != 0
+    order = np.argsort(counts[foreground])[::-1][:top_n]
+    total = max(ids.size, 1)
+    stats = {
+        "instances": int(foreground.sum()),
+        "foreground_fraction": float(counts[foreground].sum()) / total,
+        "largest": [(int(i), float(c) / total) for i, c in zip(unique_ids[foreground][order], counts[foreground][order])],
+    }
+    return image, stats
+
+
+def render_annotator(file_path, kind):
+    """Carica il .npy e restituisce (immagine RGB, statistiche) per il tipo indicato."""
+    array = _as_image_array(file_path)
+    if kind == "depth":
+        return colorize_depth(array)
+    if kind == "segmentation":
+        return colorize_segmentation(array)
+    raise ValueError(f"Tipo di annotatore non supportato: {kind}")
+
+
+def format_annotator_stats(kind, stats):
+    """Testo riassuntivo delle statistiche da mostrare sotto l'immagine."""
+    if kind == "depth":
+        if "min" not in stats:
+            return "Nessun pixel valido."
+        return (f"Profondità: min {stats['min']:.3f}, max {stats['max']:.3f}, media {stats['mean']:.3f} | "
+                f"scala {stats['range_low']:.3f}-{stats['range_high']:.3f} | "
+                f"pixel validi {stats['valid_fraction'] * 100:.1f}%")
+    largest = ", ".join(f"id {i}: {fraction * 100:.1f}%" for i, fraction in stats["largest"])
+    return (f"Istanze: {stats['instances']} | primo piano {stats['foreground_fraction'] * 100:.1f}%"
+            + (f" | più estese: {largest}" if largest else ""))
@@ -0,0 +1,191 @@
+# src/batch.py
+
+"""
+Modulo per la generazione batch: a partire da una specifica (numero di scene
+e override dei parametri di config.yaml) prepara una configurazione per ogni
+job e li esegue tramite una coda con un numero limitato di job contemporanei.
+"""
+
+import copy
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+import yaml
+
+from src.config import BATCH_MAX_IN_FLIGHT, BATCH_MAX_RETRIES
+from src.config_schema import ConfigValidationError, validate_config
+from src.jobs import GenerationJob
+from src.network import is_transient_error
+
+EXAMPLE_BATCH_SPEC = """\
+# Numero di scene da generare
+count: 4
+# Job contemporanei sul server e nuovi invii di una scena rifiutata per errori transitori
+max_in_flight: 2
+retries: 2
+# Override comuni a tutti i job (percorso puntato -> valore)
+overrides:
+  camera.height_min: 5.0
+# Override per singolo job, applicati a rotazione
+per_job:
+  - box_spawner.num_to_spawn_range: [1, 2]
+  - box_spawner.num_to_spawn_range: [3, 5]
+# Chiave opzionale da impostare a seed_start + indice del job
+# seed_key: simulation_setup.seed
+# seed_start: 0
+"""
+
+
+def set_by_path(data, dotted_path, value):
+    """Imposta 'value' nel nodo indicato da un percorso puntato (es. 'camera.height_min')."""
+    keys = dotted_path.split('.')
+    node = data
+    for key in keys[:-1]:
+        if isinstance(node, list):
+            node = node[int(key)]
+        else:
+            node = node.setdefault(key, {})
+    last = keys[-1]
+    if isinstance(node, list):
+        node[int(last)] = value
+    else:
+        node[last] = value
+
+
+def build_batch_configs(spec, base_config):
+    """Restituisce la lista delle configurazioni, una per job, descritte da 'spec'."""
+    count = int(spec.get("count", 1))
+    if count < 1:
+        raise ValueError("'count' deve essere almeno 1.")
+    common = spec.get("overrides") or {}
+    per_job = spec.get("per_job") or []
+    seed_key = spec.get("seed_key")
+    seed_start = int(spec.get("seed_start", 0))
+
+    configs = []
+    for index in range(count):
+        config = copy.deepcopy(base_config)
+        overrides = dict(common)
+        if per_job:
+            overrides.update(per_job[index % len(per_job)])
+        if seed_key:
+            overrides[seed_key] = seed_start + index
+        for dotted_path, value in overrides.items():
+            set_by_path(config, dotted_path, value)
+        configs.append(config)
+    return configs
+
+
+class GenerationQueue:
+    """Esegue un batch di job di generazione con al massimo 'max_in_flight' job attivi."""
+    def __init__(self, options, configs, max_in_flight=BATCH_MAX_IN_FLIGHT, retries=BATCH_MAX_RETRIES, session=None, registry=None):
+        self.options = list(options)
+        self.configs = configs
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.retries = max(0, int(retries))
+        self.session = session
+        self.registry = registry
+        self.completed = 0
+        self.failed = 0
+        self.errors = {}
+        self.started_at = None
+        self._active_jobs = set()
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+
+    @classmethod
+    def from_spec(cls, options, spec, base_config, session=None, registry=None):
+        """
+        Crea la coda a partire da una specifica batch (vedi EXAMPLE_BATCH_SPEC).
+        Ogni configurazione viene validata prima dell'invio: se una non è valida
+        solleva ConfigValidationError e nessun job viene avviato.
+        """
+        configs = build_batch_configs(spec, base_config)
+        errors = [(path, f"scena {index + 1}: {message}")
+                  for index, config in enumerate(configs)
+                  for path, message in validate_config(config)]
+        if errors:
+            raise ConfigValidationError(errors)
+        return cls(
+            options,
+            configs,
+            max_in_flight=spec.get("max_in_flight", BATCH_MAX_IN_FLIGHT),
+            retries=spec.get("retries", BATCH_MAX_RETRIES),
+            session=session,
+            registry=registry
+        )
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def status(self):
+        """Statistiche aggregate del batch, incluso il throughput in scene al minuto."""
+        elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "total": len(self.configs),
+            "completed": self.completed,
+            "failed": self.failed,
+            "elapsed_s": elapsed,
+            "scenes_per_minute": self.completed / (elapsed / 60.0) if elapsed > 0 else 0.0
+        }
+
+    def cancel(self):
+        """Annulla i job in corso e quelli non ancora avviati."""
+        self._cancel_event.set()
+        with self._lock:
+            active = list(self._active_jobs)
+        for job in active:
+            job.cancel()
+
+    def _run_one(self, index, work_dir):
+        config_path = os.path.join(work_dir, f"config_{index:04d}.yaml")
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(self.configs[index], f, default_flow_style=False, sort_keys=False, allow_unicode=True)
+
+        attempt = 0
+        while True:
+            if self.cancelled:
+                return {"state": "cancelled"}
+            job = GenerationJob(self.options, config_path=config_path, session=self.session, registry=self.registry)
+            with self._lock:
+                self._active_jobs.add(job)
+            try:
+                return job.run()
+            except requests.exceptions.RequestException as e:
+                # Si reinvia solo se il server non ha assegnato un job_id: altrimenti la scena
+                # è già in lavorazione (i problemi di polling li gestisce GenerationJob) e un
+                # nuovo invio la renderebbe due volte, lasciando orfano il primo job
+                if job.job_id is not None or attempt >= self.retries or not is_transient_error(e) or self.cancelled:
+                    raise
+                attempt += 1
+                self._cancel_event.wait(min(30, 2 ** attempt))
+            finally:
+                with self._lock:
+                    self._active_jobs.discard(job)
+
+    def run(self, progress_callback=None):
+        """
+        Esegue il batch. 'progress_callback(status)' viene invocato al termine di
+        ogni job con le statistiche aggregate. Restituisce lo stato finale.
+        """
+        self.started_at = time.monotonic()
+        with tempfile.TemporaryDirectory(prefix="batch_") as work_dir:
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+                futures = {executor.submit(self._run_one, index, work_dir): index for index in range(len(self.configs))}
+                for future in as_completed(futures):
+                    index = futures[future]
+                    try:
+                        result = future.result()
+                        if result["state"] == "completed":
+                            self.completed += 1
+                    except (requests.exceptions.RequestException, OSError, ValueError) as e:
+                        self.failed += 1
+                        self.errors[index] = str(e)
+                    if progress_callback:
+                        progress_callback(self.status())
+        return self.status()
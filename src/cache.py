@@ -0,0 +1,207 @@
+# src/cache.py
+
+"""
+Modulo per la cache locale persistente dei documenti del server.
+I contenuti sono salvati per hash (content-addressed) e l'indice associa
+ogni percorso del server al suo validatore HTTP (ETag / Last-Modified),
+così da poter rivalidare con una GET condizionale invece di riscaricare.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from src.config import CACHE_DIR, CACHE_MAX_BYTES
+
+
+class DocumentCache:
+    """
+    Cache su disco con limite di dimensione ed eviction LRU.
+    L'indice viene tenuto in memoria e scritto su disco con 'save()'.
+    Le voci "fissate" con 'pin()' (i file che un download ha restituito o sta
+    usando) non vengono rimosse finché non sono rilasciate con 'unpin()':
+    nel frattempo la cache può superare temporaneamente il limite.
+    """
+    INDEX_FILENAME = "index.json"
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.tmp_dir = os.path.join(cache_dir, "tmp")
+        self.index_path = os.path.join(cache_dir, self.INDEX_FILENAME)
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # percorso server -> metadati, dal meno al più recente
+        self._pins = Counter()  # percorso server -> numero di richieste che lo usano
+        self._dirty = False
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Carica l'indice scartando le voci il cui contenuto non esiste più."""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                raw_entries = json.load(f).get("entries", {})
+        except (OSError, ValueError, AttributeError):
+            raw_entries = {}
+
+        valid = [(path, entry) for path, entry in raw_entries.items()
+                 if isinstance(entry, dict) and os.path.isfile(self._blob_path(entry))]
+        valid.sort(key=lambda item: item[1].get("last_access", 0))
+        self._entries = OrderedDict(valid)
+        self._dirty = len(valid) != len(raw_entries)
+
+    def save(self):
+        """Scrive l'indice su disco in modo atomico, se è cambiato."""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"entries": self._entries}, f)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+
+    def _blob_path(self, entry):
+        digest = entry.get("sha256", "")
+        return os.path.join(self.objects_dir, digest[:2], digest + entry.get("suffix", ""))
+
+    def lookup(self, server_path):
+        """Restituisce la voce in cache per 'server_path', o None."""
+        with self._lock:
+            entry = self._entries.get(server_path)
+            if entry is None or not os.path.isfile(self._blob_path(entry)):
+                return None
+            return dict(entry)
+
+    def conditional_headers(self, entry):
+        """Header per una GET condizionale a partire dal validatore salvato."""
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def pin(self, server_paths):
+        """Protegge le voci indicate dall'eviction finché non vengono rilasciate."""
+        with self._lock:
+            self._pins.update(server_paths)
+
+    def unpin(self, server_paths):
+        """Rilascia le voci fissate con 'pin()' e riporta la cache entro il limite."""
+        with self._lock:
+            self._pins.subtract(server_paths)
+            self._pins = +self._pins  # Scarta i conteggi arrivati a zero
+            self._evict()
+
+    def touch(self, server_path):
+        """
+        Segna la voce come usata di recente e ne restituisce percorso e dimensione,
+        o None se nel frattempo è stata rimossa (da trattare come assente in cache).
+        """
+        with self._lock:
+            entry = self._entries.get(server_path)
+            if entry is None or not os.path.isfile(self._blob_path(entry)):
+                return None
+            entry["last_access"] = time.time()
+            self._entries.move_to_end(server_path)
+            self._dirty = True
+            return self._blob_path(entry), entry["size"]
+
+    def store(self, server_path, chunks, headers):
+        """
+        Scrive a blocchi il contenuto ricevuto, calcolandone l'hash al volo,
+        e aggiorna l'indice. Restituisce il percorso locale e la dimensione.
+        """
+        tmp_path = os.path.join(self.tmp_dir, uuid.uuid4().hex + ".part")
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    size += len(chunk)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self._commit(server_path, tmp_path, hasher.hexdigest(), size, headers)
+
+    def partial_path(self, server_path):
+        """Percorso stabile del download parziale di 'server_path', per poterlo riprendere."""
+        digest = hashlib.sha1(server_path.encode('utf-8')).hexdigest()
+        return os.path.join(self.tmp_dir, digest + ".part")
+
+    def store_file(self, server_path, file_path, headers):
+        """
+        Come 'store()', ma per un file già scaricato per intero (ad esempio un
+        download ripreso dopo un'interruzione): il file viene spostato nella cache.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+                size += len(chunk)
+        return self._commit(server_path, file_path, hasher.hexdigest(), size, headers)
+
+    def _commit(self, server_path, tmp_path, digest, size, headers):
+        """Sposta il contenuto scritto in 'tmp_path' tra gli oggetti e aggiorna l'indice."""
+        suffix = os.path.splitext(server_path)[1].lower()
+        entry = {
+            "sha256": digest,
+            "suffix": suffix,
+            "size": size,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "last_access": time.time(),
+        }
+        blob_path = self._blob_path(entry)
+        with self._lock:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            if os.path.exists(blob_path):
+                os.remove(tmp_path)  # Contenuto identico già presente
+            else:
+                os.replace(tmp_path, blob_path)
+            previous = self._entries.pop(server_path, None)
+            self._entries[server_path] = entry
+            if previous and previous["sha256"] != entry["sha256"]:
+                self._remove_blob_if_unused(previous)
+            self._dirty = True
+            self._evict(keep=server_path)
+        return blob_path, size
+
+    def total_bytes(self):
+        """Dimensione complessiva dei contenuti distinti in cache."""
+        with self._lock:
+            blobs = {(e["sha256"], e.get("suffix", "")): e["size"] for e in self._entries.values()}
+            return sum(blobs.values())
+
+    def _remove_blob_if_unused(self, entry):
+        key = (entry["sha256"], entry.get("suffix", ""))
+        if any((e["sha256"], e.get("suffix", "")) == key for e in self._entries.values()):
+            return
+        try:
+            os.remove(self._blob_path(entry))
+        except OSError:
+            pass
+
+    def _evict(self, keep=None):
+        """Rimuove le voci meno recenti, escluse quelle fissate, finché la cache rientra nel limite."""
+        total = self.total_bytes()
+        for server_path in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            if server_path == keep or server_path in self._pins:
+                continue
+            entry = self._entries.pop(server_path)
+            self._remove_blob_if_unused(entry)
+            total = self.total_bytes()
@@ -0,0 +1,243 @@
+# src/cli.py
+
+"""
+Riga di comando per usare il server di generazione senza interfaccia grafica,
+ad esempio dai nodi di rendering. Esempi:
+
+    python -m src.cli list --prefix output
+    python -m src.cli fetch --prefix output --dest ./scaricati
+    python -m src.cli bench-fetch --prefix output
+    python -m src.cli bench-load nuvola.npy
+    python -m src.cli generate --options replicator grip
+    python -m src.cli batch batch.yaml --options replicator
+    python -m src.cli validate
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import requests
+import yaml
+
+from src import client
+from src.config_registry import ConfigRegistry
+from src.config_schema import ConfigValidationError, check_config_file
+from src.network import format_transfer_summary, summarize_transfers
+
+
+def _print_job_progress(status):
+    if status["poll_failures"]:
+        print(f"  {status['message']}", flush=True)
+        return
+    total = status["images_total"] or "?"
+    print(f"  stato: {status['state']} - immagini {status['images_done']}/{total}", flush=True)
+
+
+def _run_job(job):
+    registry = job.registry
+    try:
+        status = job.run(progress_callback=_print_job_progress)
+    except KeyboardInterrupt:
+        print("Job annullato." if job.cancel() else job.message)
+        return 130
+    finally:
+        if registry is not None:
+            registry.save()
+    if job.config_hash:
+        print(f"Configurazione {job.config_hash[:12]} ({'caricata' if job.config_uploaded else 'già presente sul server'}).")
+    print(f"Job terminato: {status['state']}.")
+    return 0 if status["state"] == "completed" else 1
+
+
+def cmd_generate(args):
+    job = client.create_generation_job(args.options, config_path=args.config, registry=ConfigRegistry())
+    return _run_job(job)
+
+
+def cmd_regenerate(args):
+    return _run_job(client.create_generation_job(args.options, is_regenerate=True))
+
+
+def cmd_batch(args):
+    with open(args.spec, 'r', encoding='utf-8') as f:
+        spec = yaml.safe_load(f)
+    if not isinstance(spec, dict):
+        raise ValueError("La specifica deve essere un dizionario YAML.")
+    registry = ConfigRegistry()
+    queue = client.create_batch(args.options, spec, config_path=args.config, registry=registry)
+    print(f"Batch: {len(queue.configs)} scene, {queue.max_in_flight} alla volta.")
+
+    def on_progress(status):
+        print(f"  {status['completed']}/{status['total']} completate, {status['failed']} fallite, "
+              f"{status['scenes_per_minute']:.2f} scene/min", flush=True)
+
+    try:
+        status = queue.run(progress_callback=on_progress)
+    except KeyboardInterrupt:
+        queue.cancel()
+        print("Batch annullato.")
+        return 130
+    finally:
+        registry.save()
+    for index, error in sorted(queue.errors.items()):
+        print(f"  scena {index + 1}: {error}", file=sys.stderr)
+    return 0 if status["failed"] == 0 else 1
+
+
+def cmd_list(args):
+    for path in client.list_files(prefix=args.prefix):
+        print(path)
+    return 0
+
+
+def _print_fetch_progress(done, total, filename, error):
+    outcome = f"ERRORE: {error}" if error else "ok"
+    print(f"  [{done}/{total}] {filename}: {outcome}", flush=True)
+
+
+def cmd_fetch(args):
+    use_cache = not args.no_cache
+    if args.prefix and not args.files:
+        # Un'intera cartella: un solo archivio in streaming, se il server lo supporta
+        result = client.fetch_tree(args.prefix, args.dest, use_cache=use_cache, use_archive=not args.no_archive,
+                                   progress_callback=_print_fetch_progress)
+        if result.get("archive_error"):
+            print(result["archive_error"], file=sys.stderr)
+    else:
+        filenames = list(args.files)
+        if args.prefix is not None or not filenames:
+            filenames += client.list_files(prefix=args.prefix)
+        if not filenames:
+            print("Nessun file da scaricare.")
+            return 0
+        result = client.fetch(filenames, args.dest, use_cache=use_cache, progress_callback=_print_fetch_progress)
+    if args.stats:
+        _print_transfer_stats(result["files"])
+    size = sum(details["size"] for details in result["files"].values())
+    cached = sum(1 for details in result["files"].values() if details["cached"])
+    print(f"Scaricati {len(result['files'])} file ({size / 1024 ** 2:.1f} MB, {cached} dalla cache), {len(result['errors'])} errori.")
+    summary = summarize_transfers(result["files"].values())
+    if summary["files"]:
+        print(f"Rete: {format_transfer_summary(summary)}.")
+    return 0 if not result["errors"] else 1
+
+
+def _print_transfer_stats(files):
+    """Per ogni file scaricato: codifica, byte sulla rete e byte del contenuto."""
+    for filename, details in files.items():
+        if details["cached"]:
+            print(f"  {filename}: dalla cache")
+            continue
+        ratio = details["wire_bytes"] / details["size"] if details["size"] else 1.0
+        print(f"  {filename}: {details['content_encoding']}, {details['wire_bytes']} byte sulla rete "
+              f"per {details['size']} byte ({ratio:.1%})")
+
+
+def cmd_bench_fetch(args):
+    """Confronta il download di una cartella come archivio unico e file per file (senza cache)."""
+    file_count = len(client.list_files(prefix=args.prefix))
+    print(f"Cartella '{args.prefix}': {file_count} file, {args.runs} ripetizioni per modalità.")
+    for label, use_archive in (("archivio", True), ("file singoli", False)):
+        timings, size = [], 0
+        for _ in range(args.runs):
+            with tempfile.TemporaryDirectory(prefix="bench_fetch_") as dest:
+                start = time.perf_counter()
+                result = client.fetch_tree(args.prefix, dest, use_cache=False, use_archive=use_archive)
+                timings.append(time.perf_counter() - start)
+                size = sum(os.path.getsize(details["path"]) for details in result["files"].values())
+                if result["errors"]:
+                    print(f"  {label}: {len(result['errors'])} errori", file=sys.stderr)
+        best = min(timings)
+        print(f"  {label:<13} migliore {best:.3f} s, media {sum(timings) / len(timings):.3f} s, "
+              f"{size / 1024 ** 2 / best if best > 0 else 0:.1f} MB/s ({len(result['files'])} file)")
+    return 0
+
+
+def cmd_bench_load(args):
+    """Tempo e picco di memoria del caricamento di una nuvola di punti .npy."""
+    from src.pointcloud import load_npy_point_cloud
+
+    for run in range(1, args.runs + 1):
+        _, colors, stats = load_npy_point_cloud(args.file, measure_memory=True)
+        print(f"  [{run}/{args.runs}] {stats['points']} punti{' con colori' if colors is not None else ''}: "
+              f"{stats['load_s']:.3f} s, picco memoria {stats['peak_mb']:.1f} MB")
+    return 0
+
+
+def cmd_validate(args):
+    check_config_file(args.config)
+    print(f"{args.config}: configurazione valida.")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="Client headless del server di generazione.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_options(sub):
+        sub.add_argument("--options", nargs="+", choices=client.GENERATION_OPTIONS, default=["replicator"],
+                         help="Opzioni di generazione (default: replicator).")
+
+    def add_config(sub):
+        sub.add_argument("--config", default=client.DEFAULT_CONFIG_PATH, help="Percorso del config.yaml.")
+
+    sub = subparsers.add_parser("generate", help="Genera una scena e attende la fine del job.")
+    add_options(sub)
+    add_config(sub)
+    sub.set_defaults(func=cmd_generate)
+
+    sub = subparsers.add_parser("regenerate", help="Rigenera i dati dell'ultima scena.")
+    add_options(sub)
+    sub.set_defaults(func=cmd_regenerate)
+
+    sub = subparsers.add_parser("batch", help="Esegue una generazione batch da una specifica YAML.")
+    sub.add_argument("spec", help="File YAML con la specifica del batch.")
+    add_options(sub)
+    add_config(sub)
+    sub.set_defaults(func=cmd_batch)
+
+    sub = subparsers.add_parser("list", help="Elenca i file presenti sul server.")
+    sub.add_argument("--prefix", help="Solo i file sotto questa cartella.")
+    sub.set_defaults(func=cmd_list)
+
+    sub = subparsers.add_parser("fetch", help="Scarica file dal server (tutti, se non indicati).")
+    sub.add_argument("files", nargs="*", help="Percorsi dei file sul server.")
+    sub.add_argument("--prefix", help="Scarica tutti i file sotto questa cartella.")
+    sub.add_argument("--dest", default=".", help="Cartella di destinazione (default: corrente).")
+    sub.add_argument("--no-cache", action="store_true", help="Non usare la cache locale dei documenti.")
+    sub.add_argument("--no-archive", action="store_true", help="Con --prefix, scarica i file uno per uno invece che come archivio.")
+    sub.add_argument("--stats", action="store_true", help="Mostra per ogni file i byte trasferiti e quelli del contenuto.")
+    sub.set_defaults(func=cmd_fetch)
+
+    sub = subparsers.add_parser("bench-fetch", help="Confronta il download di una cartella come archivio e file per file.")
+    sub.add_argument("--prefix", required=True, help="Cartella del server da scaricare.")
+    sub.add_argument("--runs", type=int, default=3, help="Ripetizioni per modalità (default: 3).")
+    sub.set_defaults(func=cmd_bench_fetch)
+
+    sub = subparsers.add_parser("bench-load", help="Misura tempo e memoria del caricamento di una nuvola .npy.")
+    sub.add_argument("file", help="File .npy con colonne x, y, z (e r, g, b).")
+    sub.add_argument("--runs", type=int, default=3, help="Ripetizioni (default: 3).")
+    sub.set_defaults(func=cmd_bench_load)
+
+    sub = subparsers.add_parser("validate", help="Valida il config.yaml senza inviarlo.")
+    add_config(sub)
+    sub.set_defaults(func=cmd_validate)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except ConfigValidationError as e:
+        print(f"Configurazione non valida:\n{e}", file=sys.stderr)
+    except (requests.exceptions.RequestException, OSError, ValueError, yaml.YAMLError) as e:
+        print(f"Errore: {e}", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# src/client.py
+
+"""
+Client headless per il server di generazione: generazione e rigenerazione delle
+scene, generazione batch, listing e download dei file, come semplici funzioni.
+Usa solo requests, yaml e i moduli di rete del progetto, senza alcun modulo
+grafico o Open3D: è la base sia dell'interfaccia Tk sia della riga di comando
+(python -m src.cli).
+"""
+
+import os
+import shutil
+
+import yaml
+
+from src.batch import GenerationQueue
+from src.cache import DocumentCache
+from src.config import DEFAULT_CONFIG_PATH
+from src.config_schema import check_config_file
+from src.jobs import GenerationJob
+from src.network import FileFetcher, FileListing, local_path_for
+
+GENERATION_OPTIONS = ("replicator", "grip", "pinza")
+
+
+def create_generation_job(options, is_regenerate=False, config_path=DEFAULT_CONFIG_PATH, registry=None, session=None):
+    """
+    Prepara un job di generazione senza avviarlo (va eseguito con 'job.run()').
+    Per la generazione il config.yaml viene validato prima di qualsiasi richiesta:
+    solleva ConfigValidationError se non è valido e ValueError senza opzioni.
+    """
+    if not options:
+        raise ValueError("Selezionare almeno un'opzione.")
+    if not is_regenerate:
+        check_config_file(config_path)
+    return GenerationJob(options, is_regenerate=is_regenerate, config_path=config_path, session=session, registry=registry)
+
+
+def generate(options, config_path=DEFAULT_CONFIG_PATH, registry=None, progress_callback=None):
+    """Genera una scena e attende la fine del job; restituisce lo stato finale."""
+    return create_generation_job(options, config_path=config_path, registry=registry).run(progress_callback)
+
+
+def regenerate(options, progress_callback=None):
+    """Rigenera i dati dell'ultima scena e attende la fine del job."""
+    return create_generation_job(options, is_regenerate=True).run(progress_callback)
+
+
+def load_base_config(config_path=DEFAULT_CONFIG_PATH):
+    """Legge il config.yaml di base per un batch; un file assente equivale a una configurazione vuota."""
+    if not os.path.exists(config_path):
+        return {}
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return yaml.safe_load(f) or {}
+
+
+def create_batch(options, spec, config_path=DEFAULT_CONFIG_PATH, registry=None):
+    """Prepara la coda di un batch descritto da 'spec' (vedi EXAMPLE_BATCH_SPEC)."""
+    if not options:
+        raise ValueError("Selezionare almeno un'opzione.")
+    return GenerationQueue.from_spec(options, spec, load_base_config(config_path), registry=registry)
+
+
+def list_files(prefix=None, listing=None):
+    """Elenco dei file sul server, eventualmente limitato a quelli sotto 'prefix'."""
+    files = (listing or FileListing()).refresh()["files"]
+    if prefix:
+        prefix = prefix.strip('/') + '/'
+        files = [path for path in files if path.startswith(prefix)]
+    return files
+
+
+def fetch(filenames, download_dir, use_cache=True, progress_callback=None):
+    """
+    Scarica i file indicati in 'download_dir', mantenendo i percorsi del server.
+    Con la cache attiva i file già scaricati vengono solo rivalidati e poi
+    copiati dalla cache. Restituisce {"files": ..., "errors": ...} come FileFetcher.
+    """
+    cache = DocumentCache() if use_cache else None
+    result = FileFetcher(download_dir, cache=cache).fetch_many(list(filenames), progress_callback)
+    return _export_from_cache(result, download_dir) if cache is not None else result
+
+
+def fetch_tree(prefix, download_dir, use_cache=True, use_archive=True, progress_callback=None):
+    """
+    Scarica tutti i file sotto la cartella 'prefix'. Con 'use_archive' viene
+    richiesto un unico archivio in streaming, estratto al volo; se il server non
+    lo supporta si torna ai download singoli.
+    """
+    filenames = list_files(prefix=prefix)
+    if not use_archive:
+        return fetch(filenames, download_dir, use_cache, progress_callback)
+    cache = DocumentCache() if use_cache else None
+    result = FileFetcher(download_dir, cache=cache).fetch_tree(prefix.strip('/'), filenames, progress_callback)
+    return _export_from_cache(result, download_dir) if cache is not None else result
+
+
+def _export_from_cache(result, download_dir):
+    """Copia i file dalla cache a 'download_dir' e aggiorna i percorsi nei risultati."""
+    for filename, details in result["files"].items():
+        target_path = local_path_for(download_dir, filename)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        shutil.copyfile(details["path"], target_path)
+        details["path"] = target_path
+    return result
@@ -1,7 +1,59 @@
 
 # src/config.py
 
+import os
+
 #API_BASE_URL = "http://172.22.32.59:1025"
 
 
-API_BASE_URL = "http://127.0.0.1:5000"
\ No newline at end of file
+API_BASE_URL = "http://127.0.0.1:5000"
+
+# config.yaml inviato al server con le richieste di generazione (nella cartella del progetto)
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.yaml")
+
+# Recupero file: numero di download paralleli e timeout (secondi) per richiesta
+FETCH_MAX_WORKERS = 8
+FETCH_TIMEOUT = 30
+LIST_TIMEOUT = 5
+
+# Download riprendibili: tentativi consecutivi senza progressi, attesa iniziale (secondi,
+# raddoppiata a ogni tentativo) e download per intervalli paralleli dei file più grandi
+FETCH_MAX_RETRIES = 5
+FETCH_RETRY_BACKOFF = 1.0
+FETCH_PARALLEL_MIN_BYTES = 64 * 1024 ** 2
+FETCH_RANGE_PARTS = 4
+
+# Download di intere cartelle come unico archivio tar: compressione richiesta ("gz" o "none")
+# e numero minimo di file da scaricare (non già in cache con un validatore) per preferire
+# l'archivio ai download singoli
+ARCHIVE_COMPRESSION = "gz"
+ARCHIVE_MIN_FILES = 20
+
+# Cache locale persistente dei documenti scaricati dal server
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "backend_depal")
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Job di generazione: timeout dell'invio (lungo, per i server che rispondono solo a fine render),
+# intervallo di polling dello stato del job (secondi) e interrogazioni consecutive fallite
+# per errori transitori prima di rinunciare a seguire il job
+JOB_SUBMIT_TIMEOUT = 600
+JOB_POLL_INTERVAL = 2.0
+JOB_POLL_MAX_FAILURES = 10
+
+# Coda di generazione batch: job contemporanei e nuovi invii di una scena per gli errori
+# transitori (solo finché il server non ha assegnato un job_id)
+BATCH_MAX_IN_FLIGHT = 2
+BATCH_MAX_RETRIES = 2
+
+# Visualizzatore 3D: numero massimo di punti dell'anteprima (0 = sempre risoluzione piena)
+# e metodo di sottocampionamento ("voxel" o "random")
+POINTCLOUD_PREVIEW_BUDGET = 200_000
+POINTCLOUD_LOD_METHOD = "voxel"
+
+# Anteprime 2D delle nuvole di punti mostrate nel pannello del visualizzatore
+# e spazio massimo su disco delle anteprime salvate (eviction LRU)
+POINTCLOUD_THUMBNAIL_SIZE = (960, 720)
+THUMBNAIL_CACHE_MAX_BYTES = 256 * 1024 ** 2
+
+# Numero massimo di miniature di immagini tenute in memoria (LRU)
+IMAGE_CACHE_MAX_ENTRIES = 64
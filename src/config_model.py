@@ -0,0 +1,161 @@
+# src/config_model.py
+
+"""
+Modulo con il modello dati dell'editor di configurazione YAML.
+I valori originali restano nella struttura caricata dal file; le modifiche
+dell'utente sono tenute a parte, indicizzate per percorso YAML, e vengono
+applicate solo al salvataggio copiando i soli contenitori interessati.
+Contiene anche l'indice di ricerca su percorsi e valori usato dall'editor.
+"""
+
+from collections import defaultdict
+
+
+def format_path(path):
+    """Converte un percorso (tupla di chiavi e indici) nella forma 'a.b[0].c'."""
+    text = ""
+    for key in path:
+        if isinstance(key, int):
+            text += f"[{key}]"
+        else:
+            text += f".{key}" if text else str(key)
+    return text
+
+
+def cast_value(text, original):
+    """Converte il testo inserito nel tipo del valore originale; se fallisce resta una stringa."""
+    original_type = type(original)
+    try:
+        if original_type is bool: return text.lower() in ['true', '1', 't', 'y', 'yes']
+        if original is None: return None if text.lower() == 'none' else text
+        return original_type(text)
+    except (ValueError, TypeError):
+        return text
+
+
+def value_to_text(value):
+    return "" if value is None else str(value)
+
+
+class ConfigModel:
+    """Configurazione YAML con le modifiche pendenti indicizzate per percorso."""
+    def __init__(self, data):
+        self.data = data
+        self.edits = {}  # percorso (tupla) -> testo inserito dall'utente
+
+    def get(self, path):
+        node = self.data
+        for key in path:
+            node = node[key]
+        return node
+
+    def children(self, path):
+        """Figli diretti di un contenitore come coppie (chiave, percorso)."""
+        node = self.get(path)
+        if isinstance(node, dict):
+            return [(key, path + (key,)) for key in node]
+        if isinstance(node, list):
+            return [(index, path + (index,)) for index in range(len(node))]
+        return []
+
+    def is_container(self, path):
+        return isinstance(self.get(path), (dict, list))
+
+    def iter_paths(self, path=()):
+        """Tutti i percorsi dell'albero in ordine di visita, esclusa la radice."""
+        for _, child_path in self.children(path):
+            yield child_path
+            yield from self.iter_paths(child_path)
+
+    def value_text(self, path):
+        """Testo corrente di una foglia: la modifica pendente o il valore originale."""
+        if path in self.edits:
+            return self.edits[path]
+        return value_to_text(self.get(path))
+
+    def set_text(self, path, text):
+        """Registra una modifica; tornare al valore originale la annulla."""
+        if text == value_to_text(self.get(path)):
+            self.edits.pop(path, None)
+        else:
+            self.edits[path] = text
+
+    def is_modified(self, path):
+        return path in self.edits
+
+    def to_data(self):
+        """
+        Restituisce la configurazione con le modifiche applicate. Vengono copiati
+        solo i contenitori lungo i percorsi modificati; il resto è condiviso.
+        """
+        if not self.edits:
+            return self.data
+        result = self._copy(self.data)
+        copied = {(): result}
+        for path, text in self.edits.items():
+            node = result
+            for depth in range(len(path) - 1):
+                prefix = path[:depth + 1]
+                if prefix not in copied:
+                    node[path[depth]] = copied[prefix] = self._copy(node[path[depth]])
+                node = copied[prefix]
+            node[path[-1]] = cast_value(text, node[path[-1]])
+        return result
+
+    @staticmethod
+    def _copy(node):
+        return dict(node) if isinstance(node, dict) else list(node)
+
+
+class ConfigSearchIndex:
+    """
+    Indice di ricerca per sottostringa su percorsi completi e valori delle foglie.
+    Ogni voce è indicizzata per trigrammi (indice invertito): una ricerca interseca
+    le liste dei trigrammi della query e verifica solo i candidati rimasti. Se la
+    nuova query estende la precedente, si filtrano solo i risultati già trovati.
+    """
+    NGRAM = 3
+
+    def __init__(self, model):
+        self.model = model
+        self._texts = {}                   # percorso -> testo indicizzato, in minuscolo
+        self._postings = defaultdict(set)  # trigramma -> percorsi che lo contengono
+        self._paths = list(model.iter_paths())
+        self._order = {path: i for i, path in enumerate(self._paths)}
+        self._last_query = None
+        self._last_results = []
+        for path in self._paths:
+            self._add(path)
+
+    def _grams(self, text):
+        return {text[i:i + self.NGRAM] for i in range(len(text) - self.NGRAM + 1)}
+
+    def _add(self, path):
+        value = "" if self.model.is_container(path) else self.model.value_text(path)
+        text = f"{format_path(path)}\n{value}".lower()
+        self._texts[path] = text
+        for gram in self._grams(text):
+            self._postings[gram].add(path)
+
+    def update(self, path):
+        """Reindicizza una foglia dopo una modifica del suo valore."""
+        for gram in self._grams(self._texts.pop(path, "")):
+            self._postings[gram].discard(path)
+        self._add(path)
+        self._last_query = None
+
+    def search(self, query):
+        """Percorsi (in ordine di documento) il cui percorso o valore contiene 'query'."""
+        query = query.strip().lower()
+        if not query:
+            return []
+        if self._last_query and self._last_query in query:
+            candidates = self._last_results
+        elif len(query) >= self.NGRAM:
+            postings = sorted((self._postings.get(gram, set()) for gram in self._grams(query)), key=len)
+            candidates = sorted(set.intersection(*postings), key=self._order.__getitem__)
+        else:
+            candidates = self._paths
+        results = [path for path in candidates if query in self._texts[path]]
+        self._last_query, self._last_results = query, results
+        return results
@@ -0,0 +1,162 @@
+# src/config_registry.py
+
+"""
+Modulo per il registro locale delle configurazioni inviate al server.
+Ogni config.yaml è identificato dall'hash del suo contenuto normalizzato
+(indipendente da formattazione e ordine delle chiavi): il server può così
+riconoscere una configurazione già ricevuta senza doverla ricaricare, e il
+registro collega ogni file di output alla configurazione che lo ha prodotto.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import yaml
+
+from src.config import CACHE_DIR
+
+CONFIG_REGISTRY_DIR = os.path.join(CACHE_DIR, "configs")
+
+
+def config_digest(config_bytes):
+    """
+    SHA-256 della configurazione normalizzata (JSON con chiavi ordinate).
+    Se il YAML non è leggibile si usa il contenuto così com'è.
+    """
+    try:
+        normalized = json.dumps(yaml.safe_load(config_bytes), sort_keys=True, separators=(",", ":"), default=str).encode('utf-8')
+    except yaml.YAMLError:
+        normalized = config_bytes
+    return hashlib.sha256(normalized).hexdigest()
+
+
+class ConfigRegistry:
+    """
+    Registro su disco: hash -> invii (job e intervallo di esecuzione) e
+    file di output -> hash. Se il server riporta i file prodotti da un job
+    ("output_files" nello stato), questi vengono attribuiti con esattezza alla
+    sua configurazione. Altrimenti vale una stima temporale: i file che
+    compaiono nel listing mentre è attiva una sola configurazione (o poco dopo
+    la sua conclusione) le vengono attribuiti. Con configurazioni diverse in
+    esecuzione insieme, ad esempio un batch con max_in_flight > 1, o con una
+    rigenerazione in corso (configurazione sconosciuta), la stima non
+    attribuisce nulla.
+    """
+    INDEX_FILENAME = "registry.json"
+    OUTPUT_GRACE_S = 120
+    MAX_SUBMISSIONS = 20
+
+    def __init__(self, registry_dir=CONFIG_REGISTRY_DIR):
+        self.registry_dir = registry_dir
+        self.index_path = os.path.join(registry_dir, self.INDEX_FILENAME)
+        self._lock = threading.RLock()
+        self._configs = {}  # hash -> {"first_submitted": ..., "submissions": [...]}
+        self._outputs = {}  # percorso del file sul server -> hash
+        self._untracked = []  # invii senza configurazione (rigenerazioni), solo in memoria
+        self._dirty = False
+
+        os.makedirs(registry_dir, exist_ok=True)
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._configs = data.get("configs", {})
+            self._outputs = data.get("outputs", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+        # Invii rimasti aperti da una sessione precedente: chiusi e mai più attivi,
+        # altrimenti i file già presenti sul server verrebbero attribuiti a loro
+        for entry in self._configs.values():
+            for submission in entry["submissions"]:
+                if submission["finished_at"] is None:
+                    submission["finished_at"] = submission["started_at"]
+                    submission["interrupted"] = True
+
+    def save(self):
+        """Scrive il registro su disco in modo atomico, se è cambiato."""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"configs": self._configs, "outputs": self._outputs}, f)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+
+    def config_path(self, digest):
+        """Percorso della copia locale della configurazione con questo hash."""
+        return os.path.join(self.registry_dir, f"{digest}.yaml")
+
+    def start_submission(self, digest, config_bytes=None):
+        """
+        Registra l'inizio di un invio e salva una copia della configurazione.
+        Con 'digest' None registra un job senza configurazione nota (rigenerazione).
+        """
+        if digest is None:
+            submission = {"job_id": None, "started_at": time.time(), "finished_at": None}
+            with self._lock:
+                now = submission["started_at"]
+                self._untracked = [s for s in self._untracked if self._is_active(s, now)] + [submission]
+            return submission
+        path = self.config_path(digest)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(config_bytes)
+            os.replace(tmp_path, path)
+        submission = {"job_id": None, "started_at": time.time(), "finished_at": None}
+        with self._lock:
+            entry = self._configs.setdefault(digest, {"first_submitted": submission["started_at"], "submissions": []})
+            entry["submissions"] = entry["submissions"][-(self.MAX_SUBMISSIONS - 1):] + [submission]
+            self._dirty = True
+        return submission
+
+    def finish_submission(self, submission, job_id=None, output_files=()):
+        """Chiude un invio; 'output_files' sono i file che il server attribuisce al job."""
+        with self._lock:
+            submission["job_id"] = job_id
+            submission["finished_at"] = time.time()
+            self._dirty = True
+            digest = next((digest for digest, entry in self._configs.items()
+                           if any(s is submission for s in entry["submissions"])), None)
+            if digest is not None:
+                for path in output_files:
+                    self._outputs[path] = digest
+
+    def _is_active(self, submission, now):
+        if submission.get("interrupted"):
+            return False
+        finished = submission["finished_at"]
+        return submission["started_at"] <= now and (finished is None or now <= finished + self.OUTPUT_GRACE_S)
+
+    def _active_digests(self, now):
+        """Hash delle configurazioni attive; None rappresenta un job senza configurazione."""
+        active = {digest for digest, entry in self._configs.items()
+                  if any(self._is_active(submission, now) for submission in entry["submissions"])}
+        if any(self._is_active(submission, now) for submission in self._untracked):
+            active.add(None)
+        return active
+
+    def attribute_outputs(self, files, now=None):
+        """
+        Collega i nuovi file del listing alla configurazione attiva, se è una sola
+        ed è nota. Restituisce il numero di file attribuiti.
+        """
+        with self._lock:
+            active = self._active_digests(now or time.time())
+            if len(active) != 1 or None in active:
+                return 0
+            digest = active.pop()
+            new_files = [path for path in files if path not in self._outputs]
+            for path in new_files:
+                self._outputs[path] = digest
+            if new_files:
+                self._dirty = True
+            return len(new_files)
+
+    def config_for_file(self, server_path):
+        """Hash della configurazione che ha prodotto il file, o None se non è noto."""
+        with self._lock:
+            return self._outputs.get(server_path)
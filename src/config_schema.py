@@ -0,0 +1,292 @@
+# src/config_schema.py
+
+"""
+Modulo per la validazione di config.yaml prima del salvataggio e dell'invio al
+server. Lo schema è composto da funzioni di controllo costruite una sola volta
+all'import: la validazione è quindi una singola visita della configurazione e
+restituisce l'elenco degli errori con il percorso preciso del valore sbagliato.
+"""
+
+import yaml
+
+from src.config_model import format_path
+
+
+class ConfigValidationError(ValueError):
+    """Configurazione non conforme allo schema; 'errors' contiene le coppie (percorso, messaggio)."""
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__(format_errors(errors))
+
+
+def format_errors(errors, limit=20):
+    """Testo leggibile con un errore per riga."""
+    lines = [f"{format_path(path) or '(radice)'}: {message}" for path, message in errors[:limit]]
+    if len(errors) > limit:
+        lines.append(f"... e altri {len(errors) - limit} errori")
+    return "\n".join(lines)
+
+
+# --- Costruttori dei controlli: ognuno restituisce check(value, path, errors) ---
+
+def number(minimum=None, maximum=None, integer=False, positive=False):
+    kind = "un intero" if integer else "un numero"
+
+    def check(value, path, errors):
+        if isinstance(value, bool) or not isinstance(value, int if integer else (int, float)):
+            errors.append((path, f"atteso {kind}, trovato {value!r}"))
+        elif positive and value <= 0:
+            errors.append((path, f"deve essere maggiore di 0, trovato {value}"))
+        elif minimum is not None and value < minimum:
+            errors.append((path, f"deve essere >= {minimum}, trovato {value}"))
+        elif maximum is not None and value > maximum:
+            errors.append((path, f"deve essere <= {maximum}, trovato {value}"))
+    return check
+
+
+def integer(minimum=None, maximum=None):
+    return number(minimum, maximum, integer=True)
+
+
+def probability():
+    return number(0.0, 1.0)
+
+
+def boolean():
+    def check(value, path, errors):
+        if not isinstance(value, bool):
+            errors.append((path, f"atteso true/false, trovato {value!r}"))
+    return check
+
+
+def string(choices=None, nullable=False):
+    def check(value, path, errors):
+        if value is None and nullable:
+            return
+        if not isinstance(value, str):
+            errors.append((path, f"attesa una stringa, trovato {value!r}"))
+        elif choices and value not in choices:
+            errors.append((path, f"valore '{value}' non ammesso (ammessi: {', '.join(choices)})"))
+    return check
+
+
+def list_of(item_check, nullable=True):
+    def check(value, path, errors):
+        if value is None and nullable:
+            return
+        if not isinstance(value, list):
+            errors.append((path, f"attesa una lista, trovato {value!r}"))
+            return
+        for index, item in enumerate(value):
+            item_check(item, path + (index,), errors)
+    return check
+
+
+def vector(length, item_check):
+    def check(value, path, errors):
+        if not isinstance(value, list) or len(value) != length:
+            errors.append((path, f"attesa una lista di {length} elementi, trovato {value!r}"))
+            return
+        for index, item in enumerate(value):
+            item_check(item, path + (index,), errors)
+    return check
+
+
+def value_range(item_check):
+    """Coppia [min, max] con min <= max (elemento per elemento per i vettori)."""
+    def check(value, path, errors):
+        if not isinstance(value, list) or len(value) != 2:
+            errors.append((path, f"atteso un intervallo [min, max], trovato {value!r}"))
+            return
+        count = len(errors)
+        item_check(value[0], path + (0,), errors)
+        item_check(value[1], path + (1,), errors)
+        if len(errors) > count:
+            return
+        low, high = value
+        if isinstance(low, list):
+            if any(l > h for l, h in zip(low, high)):
+                errors.append((path, f"il minimo {low} supera il massimo {high} in almeno una componente"))
+        elif low > high:
+            errors.append((path, f"il minimo {low} supera il massimo {high}"))
+    return check
+
+
+def mapping_of(value_check):
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            errors.append((path, f"atteso un dizionario, trovato {value!r}"))
+            return
+        for key, item in value.items():
+            value_check(item, path + (key,), errors)
+    return check
+
+
+def section(fields, ordered=()):
+    """
+    Dizionario con i campi noti in 'fields' (le chiavi sconosciute sono ignorate)
+    e le coppie di chiavi in 'ordered' che devono rispettare min <= max.
+    """
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            errors.append((path, f"atteso un dizionario, trovato {value!r}"))
+            return
+        count = len(errors)
+        for key, field_check in fields.items():
+            if key in value:
+                field_check(value[key], path + (key,), errors)
+        if len(errors) > count:
+            return
+        for low_key, high_key in ordered:
+            if low_key in value and high_key in value and value[low_key] > value[high_key]:
+                errors.append((path + (low_key,), f"{low_key} ({value[low_key]}) supera {high_key} ({value[high_key]})"))
+    return check
+
+
+def axes(item_check):
+    return section({"x": item_check, "y": item_check, "z": item_check})
+
+
+# --- Schema di config.yaml ---
+
+_color_range = value_range(vector(3, number(0.0, 1.0)))
+_unit_range = value_range(number(0.0, 1.0))
+_asset = section({
+    "usd_asset_paths": list_of(string()),
+    "scale_multiplier_xyz": vector(3, number(positive=True)),
+    "mass_kg": number(positive=True),
+    "semantic_label": string(),
+    "prim_name_instance_base": string(),
+})
+
+CONFIG_SCHEMA = section({
+    "simulation_setup": section({
+        "headless": boolean(),
+        "num_images_to_generate": integer(minimum=1),
+        "simulation_updates_after_setup": integer(minimum=0),
+    }),
+    "paths": mapping_of(string()),
+    "invisible_wall_during_fall": section({"probability_activation": probability()}),
+    "camera": section({
+        "height_min": number(positive=True),
+        "height_max": number(positive=True),
+        "focal_length": number(positive=True),
+        "rotation_xyz": vector(3, number()),
+    }, ordered=[("height_min", "height_max")]),
+    "stereo_camera_setup": section({
+        "enable": boolean(),
+        "rig_prim_path": string(),
+        "left_cam_name": string(),
+        "right_cam_name": string(),
+    }),
+    "material_creator": section({
+        "texture_scale_range": value_range(number(positive=True)),
+        "metallic_range": _unit_range,
+        "roughness_range": _unit_range,
+        "specular_level_range": _unit_range,
+        "ior_range": value_range(number(minimum=1.0)),
+        "emissive_probability": probability(),
+        "base_color_rgb_range": _color_range,
+        "emissive_rgb_range": _color_range,
+        "emissive_strength_range": value_range(number(minimum=0.0)),
+        "clearcoat_intensity_range": _unit_range,
+        "clearcoat_roughness_range": _unit_range,
+        "normal_intensity_range": _unit_range,
+    }),
+    "light_creator": section({
+        "num_lights_range": value_range(integer(minimum=0)),
+        "clear_existing": boolean(),
+        "configurations": list_of(section({
+            "type": string(choices=["DomeLight", "SphereLight", "DistantLight", "RectLight", "DiskLight", "CylinderLight"]),
+            "position_range": axes(value_range(number())),
+            "orientation_euler_range": axes(value_range(number())),
+            "intensity_range": value_range(number(minimum=0.0)),
+            "color_range": _color_range,
+            "enable_color_temperature": boolean(),
+            "temperature_k_range": value_range(number(positive=True)),
+            "radius_range": value_range(number(minimum=0.0)),
+            "angle_range": value_range(number(minimum=0.0)),
+        }), nullable=False),
+    }),
+    "asset_spawner": section({
+        "enable": boolean(),
+        "scene_origin_xyz": vector(3, number()),
+        "cm_to_m_scale_factor": number(positive=True),
+        "asset_material_application_probability": probability(),
+        "asset_type_choice_override": string(nullable=True),
+        "random_asset_rotation_z_range": value_range(number()),
+        "pallet": _asset,
+        "container": _asset,
+    }),
+    "box_spawner": section({
+        "enable": boolean(),
+        "num_to_spawn_range": value_range(integer(minimum=0)),
+        "mass_kg": number(positive=True),
+        "base_z_offset": number(),
+        "z_jitter": number(minimum=0.0),
+        "xy_jitter_range": value_range(number()),
+        "procedural_vs_asset_probability": probability(),
+        "asset_material_override_probability": probability(),
+        "asset_usd_paths": list_of(string()),
+        "scale_min": number(positive=True),
+        "scale_max": number(positive=True),
+        "default_color_rgb": vector(3, number(0.0, 1.0)),
+        "semantic_label": string(),
+    }, ordered=[("scale_min", "scale_max")]),
+    "object_creator_ycb": section({
+        "enable": boolean(),
+        "asset_list": list_of(string()),
+        "materials_folder_path": string(),
+        "num_to_spawn_range": value_range(integer(minimum=0)),
+        "spawn_parent_path": string(),
+        "base_pos_xy": vector(2, number()),
+        "spawn_z_offset": number(),
+        "spawn_z_jitter": number(minimum=0.0),
+        "spawn_xy_jitter_range": value_range(number()),
+        "spawn_scale_min": number(positive=True),
+        "spawn_scale_max": number(positive=True),
+        "spawn_mass": number(positive=True),
+        "semantic_label": string(),
+        "asset_material_override_probability": probability(),
+    }, ordered=[("spawn_scale_min", "spawn_scale_max")]),
+    "replicator": section({
+        "resolution_wh": vector(2, integer(minimum=1)),
+        "renderer_active": string(),
+        "rtx_rendermode": string(),
+        "rtx_pathtracing_spp": integer(minimum=1),
+        "stereo_baseline": number(minimum=0.0),
+        "annotators_to_attach": list_of(string()),
+        "writer_outputs": mapping_of(boolean()),
+    }),
+    "grip": section({
+        "grip_sample": number(positive=True),
+        "max_tilt_deg": number(0.0, 90.0),
+    }),
+    "pinza": section({"num_candidate_poses": integer(minimum=1)}),
+})
+
+
+def validate_config(config):
+    """Restituisce la lista degli errori (percorso, messaggio); vuota se la configurazione è valida."""
+    errors = []
+    CONFIG_SCHEMA(config, (), errors)
+    return errors
+
+
+def check_config(config):
+    """Solleva ConfigValidationError se la configurazione non è valida."""
+    errors = validate_config(config)
+    if errors:
+        raise ConfigValidationError(errors)
+
+
+def check_config_file(config_path):
+    """Valida il file indicato; un file assente non è un errore (si procede senza)."""
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+    except FileNotFoundError:
+        return
+    except yaml.YAMLError as e:
+        raise ConfigValidationError([((), f"YAML non valido: {e}")])
+    check_config(config or {})
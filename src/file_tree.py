@@ -0,0 +1,168 @@
+# src/file_tree.py
+
+"""
+Modulo con il modello dati dell'albero dei file del server.
+Tiene struttura, cartelle espanse e selezione in semplici strutture Python,
+indipendenti dai widget: la vista chiede solo le righe attualmente visibili.
+"""
+
+
+class FileTreeModel:
+    """Albero dei file con stato di espansione e selezione."""
+    def __init__(self):
+        self.root = {}          # cartella -> dict dei figli, file -> None
+        self.files = []         # percorsi nell'ordine ricevuto dal server
+        self.expanded = set()   # percorsi delle cartelle espanse
+        self.selected = set()   # percorsi dei file selezionati
+        self._sorted_children = {}
+        self._visible_rows = None
+
+    def set_files(self, file_paths):
+        """Ricostruisce l'albero, mantenendo espansione e selezione ancora valide."""
+        self.files = list(file_paths)
+        self.root = {}
+        for path in self.files:
+            parts = path.split('/')
+            node = self.root
+            for part in parts[:-1]:
+                node = node.setdefault(part, {})
+            node[parts[-1]] = None
+
+        file_set = set(self.files)
+        self.selected &= file_set
+        self.expanded = {path for path in self.expanded if self._find_node(path) is not None}
+        self._invalidate()
+
+    def apply_delta(self, added, removed):
+        """
+        Applica solo le differenze rispetto al listing corrente: il lavoro
+        sull'albero è proporzionale al numero di file aggiunti o rimossi.
+        """
+        known = set(self.files)
+        removed = set(removed) & known
+        added = [path for path in added if path not in known]
+        if removed:
+            self.files = [path for path in self.files if path not in removed]
+            for path in removed:
+                self._remove_path(path)
+            self.selected -= removed
+            self.expanded = {path for path in self.expanded if self._find_node(path) is not None}
+        for path in added:
+            self._insert_path(path)
+        self.files.extend(added)
+        if added or removed:
+            self._visible_rows = None
+
+    def _insert_path(self, path):
+        parts = path.split('/')
+        node = self.root
+        for depth, part in enumerate(parts[:-1]):
+            if part not in node:
+                self._sorted_children.pop('/'.join(parts[:depth]), None)
+            node = node.setdefault(part, {})
+        node[parts[-1]] = None
+        self._sorted_children.pop('/'.join(parts[:-1]), None)
+
+    def _remove_path(self, path):
+        parts = path.split('/')
+        chain = [self.root]
+        for part in parts[:-1]:
+            chain.append(chain[-1].get(part))
+            if not isinstance(chain[-1], dict):
+                return
+        chain[-1].pop(parts[-1], None)
+        # Risale eliminando le cartelle rimaste vuote
+        for depth in range(len(parts) - 1, -1, -1):
+            self._sorted_children.pop('/'.join(parts[:depth]), None)
+            if depth == 0 or chain[depth]:
+                break
+            chain[depth - 1].pop(parts[depth - 1], None)
+
+    def _invalidate(self):
+        self._sorted_children = {}
+        self._visible_rows = None
+
+    def _find_node(self, folder_path):
+        node = self.root
+        for part in folder_path.split('/'):
+            if not isinstance(node, dict) or not isinstance(node.get(part), dict):
+                return None
+            node = node[part]
+        return node
+
+    def _children(self, folder_path, node):
+        """Figli ordinati di una cartella: prima i file, poi le sottocartelle."""
+        children = self._sorted_children.get(folder_path)
+        if children is None:
+            children = sorted(node.items(), key=lambda x: (isinstance(x[1], dict), x[0]))
+            self._sorted_children[folder_path] = children
+        return children
+
+    def visible_rows(self):
+        """
+        Restituisce le righe visibili come tuple (percorso, nome, profondità, è_cartella),
+        visitando solo le cartelle espanse.
+        """
+        if self._visible_rows is None:
+            rows = []
+            self._collect_rows("", self.root, 0, rows)
+            self._visible_rows = rows
+        return self._visible_rows
+
+    def _collect_rows(self, folder_path, node, depth, rows):
+        for name, content in self._children(folder_path, node):
+            path = f"{folder_path}/{name}" if folder_path else name
+            is_folder = isinstance(content, dict)
+            rows.append((path, name, depth, is_folder))
+            if is_folder and path in self.expanded:
+                self._collect_rows(path, content, depth + 1, rows)
+
+    def is_expanded(self, folder_path):
+        return folder_path in self.expanded
+
+    def toggle_expanded(self, folder_path):
+        """Espande o chiude una cartella."""
+        if folder_path in self.expanded:
+            self.expanded.discard(folder_path)
+        else:
+            self.expanded.add(folder_path)
+        self._visible_rows = None
+
+    def is_selected(self, file_path):
+        return file_path in self.selected
+
+    def set_selected(self, file_path, selected):
+        if selected:
+            self.selected.add(file_path)
+        else:
+            self.selected.discard(file_path)
+
+    def select_all(self, selected):
+        self.selected = set(self.files) if selected else set()
+
+    def all_selected(self):
+        """True se tutti i file del listing (almeno uno) sono selezionati."""
+        return bool(self.files) and len(self.selected) == len(self.files)
+
+    def selected_files(self):
+        """File selezionati, nell'ordine del listing del server."""
+        return [path for path in self.files if path in self.selected]
+
+    def covering_folder(self, file_paths):
+        """
+        Restituisce la cartella più interna che contiene tutti 'file_paths' e
+        nessun altro file, oppure None (es. file sparsi o selezione parziale).
+        """
+        if not file_paths:
+            return None
+        parts = [path.split('/')[:-1] for path in file_paths]
+        common = []
+        for names in zip(*parts):
+            if len(set(names)) != 1:
+                break
+            common.append(names[0])
+        if not common:
+            return None
+        folder = '/'.join(common)
+        contained = sum(1 for path in self.files if path.startswith(folder + '/'))
+        return folder if contained == len(set(file_paths)) else None
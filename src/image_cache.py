@@ -0,0 +1,55 @@
+# src/image_cache.py
+
+"""
+Modulo per la decodifica e la cache delle miniature delle immagini.
+Le immagini vengono decodificate a risoluzione ridotta quando il formato lo
+permette (draft per JPEG, reduce per gli altri) e le miniature ottenute sono
+tenute in una cache LRU per file e dimensione di destinazione.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+from src.config import IMAGE_CACHE_MAX_ENTRIES
+
+
+def load_thumbnail(image_path, width, height):
+    """Decodifica l'immagine già ridotta per stare in (width, height)."""
+    with Image.open(image_path) as image:
+        # 'draft' fa decodificare i JPEG direttamente in scala; 'reducing_gap'
+        # applica prima un 'reduce' intero, molto più veloce di LANCZOS a piena risoluzione
+        image.draft("RGB", (width, height))
+        image.thumbnail((width, height), Image.Resampling.LANCZOS, reducing_gap=2.0)
+        if image.mode not in ("RGB", "RGBA", "L"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        image.load()
+        return image
+
+
+class ThumbnailCache:
+    """Cache LRU thread-safe delle miniature, invalidata se il file cambia."""
+    def __init__(self, max_entries=IMAGE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, image_path, width, height):
+        """Restituisce la miniatura, decodificandola solo se non è in cache."""
+        stat = os.stat(image_path)
+        key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, width, height)
+        with self._lock:
+            thumbnail = self._entries.get(key)
+            if thumbnail is not None:
+                self._entries.move_to_end(key)
+                return thumbnail
+
+        thumbnail = load_thumbnail(image_path, width, height)
+        with self._lock:
+            self._entries[key] = thumbnail
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return thumbnail
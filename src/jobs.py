@@ -0,0 +1,232 @@
+# src/jobs.py
+
+"""
+Modulo per i job di generazione della scena.
+Il client invia la richiesta, riceve un 'job_id' e ne interroga lo stato
+(immagini completate sul totale) fino al termine, con possibilità di annullare.
+I server che non supportano i job rispondono direttamente a fine render:
+in quel caso il job risulta subito completato.
+Il config.yaml viene caricato solo se il server non ne ha già una copia con
+lo stesso hash; altrimenti si invia soltanto l'hash.
+"""
+
+import json
+import os
+import threading
+
+import requests
+
+from src.config import API_BASE_URL, JOB_POLL_INTERVAL, JOB_POLL_MAX_FAILURES, JOB_SUBMIT_TIMEOUT, LIST_TIMEOUT
+from src.config_registry import config_digest
+from src.network import get_session, is_transient_error
+
+TERMINAL_STATES = ("completed", "failed", "cancelled")
+
+# Attesa massima (secondi) tra due interrogazioni dello stato fallite
+POLL_MAX_DELAY = 30
+
+
+def build_generation_request(options, is_regenerate=False, config_bytes=None, config_hash=None, upload=True):
+    """
+    Restituisce endpoint e argomenti della POST di generazione, nello stesso
+    formato usato dal server: form multipart con 'config_file' quando il
+    config.yaml è disponibile, altrimenti JSON con le sole opzioni.
+    Con 'upload=False' il form contiene solo 'config_hash', senza il file.
+    """
+    endpoint = "/regenerate_data" if is_regenerate else "/generate_scene"
+    if not is_regenerate and config_bytes is not None:
+        data = {'options': json.dumps(options), 'async': 'true'}
+        if config_hash:
+            data['config_hash'] = config_hash
+        if not upload:
+            return endpoint, {"data": data}
+        return endpoint, {
+            "data": data,
+            "files": {'config_file': ('config.yaml', config_bytes, 'application/x-yaml')}
+        }
+    return endpoint, {"json": {"options": options, "async": True}}
+
+
+class GenerationJob:
+    """Un job di generazione (o rigenerazione) sul server."""
+    def __init__(self, options, is_regenerate=False, config_path=None, session=None, poll_interval=JOB_POLL_INTERVAL, registry=None):
+        self.options = list(options)
+        self.is_regenerate = is_regenerate
+        self.config_path = config_path
+        self.config_hash = None
+        self.config_uploaded = False
+        self.registry = registry
+        self._submission = None
+        self.output_files = []  # File prodotti dal job, se il server li riporta nello stato
+        self.session = session or get_session()
+        self.poll_interval = poll_interval
+        self.job_id = None
+        self.state = "pending"
+        self.images_done = 0
+        self.images_total = None
+        self.message = ""
+        self.poll_failures = 0  # Interrogazioni consecutive dello stato fallite
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def status(self):
+        """Istantanea dello stato corrente del job."""
+        return {
+            "job_id": self.job_id,
+            "state": self.state,
+            "images_done": self.images_done,
+            "images_total": self.images_total,
+            "message": self.message,
+            "poll_failures": self.poll_failures
+        }
+
+    def _read_config(self):
+        if self.is_regenerate or not self.config_path or not os.path.exists(self.config_path):
+            return None
+        with open(self.config_path, 'rb') as config_file_obj:
+            return config_file_obj.read()
+
+    def _server_has_config(self):
+        """
+        HEAD /configs/<hash>: 200 se il server ha già la configurazione.
+        Qualsiasi altra risposta (anche un server senza questo endpoint) porta al caricamento completo.
+        """
+        try:
+            response = self.session.head(f"{API_BASE_URL}/configs/{self.config_hash}", timeout=LIST_TIMEOUT)
+        except requests.exceptions.RequestException:
+            return False
+        return response.status_code == 200
+
+    def _post(self, config_bytes, upload):
+        endpoint, kwargs = build_generation_request(self.options, self.is_regenerate, config_bytes, self.config_hash, upload)
+        return self.session.post(f"{API_BASE_URL}{endpoint}", timeout=JOB_SUBMIT_TIMEOUT, **kwargs)
+
+    def submit(self):
+        """Invia la richiesta di generazione al server."""
+        config_bytes = self._read_config()
+        if config_bytes is not None:
+            self.config_hash = config_digest(config_bytes)
+            if self.registry is not None:
+                self._submission = self.registry.start_submission(self.config_hash, config_bytes)
+        elif self.registry is not None:
+            # Rigenerazione o job senza config: i suoi file non vanno attribuiti ad altre configurazioni
+            self._submission = self.registry.start_submission(None)
+        self.config_uploaded = config_bytes is not None and not self._server_has_config()
+        response = self._post(config_bytes, self.config_uploaded)
+        if config_bytes is not None and not self.config_uploaded and response.status_code in (404, 409, 412):
+            # Il server non ha più la configurazione indicata dall'hash: si carica il file
+            self.config_uploaded = True
+            response = self._post(config_bytes, True)
+        response.raise_for_status()
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+
+        self.job_id = data.get("job_id")
+        if self.job_id is None:
+            # Server senza supporto ai job: la risposta arriva a generazione conclusa
+            self.state = "completed"
+            self.message = data.get("message", "")
+        else:
+            self.state = data.get("state", "queued")
+            self.images_total = data.get("images_total")
+        return self.status()
+
+    def poll(self):
+        """Aggiorna lo stato del job interrogando il server."""
+        response = self.session.get(f"{API_BASE_URL}/job_status/{self.job_id}", timeout=LIST_TIMEOUT)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") == "error":
+            raise requests.exceptions.RequestException(f"Errore API: {data.get('message')}")
+        self.state = data.get("state", self.state)
+        self.images_done = data.get("images_done", self.images_done)
+        self.images_total = data.get("images_total", self.images_total)
+        self.message = data.get("message", self.message)
+        self.output_files = data.get("output_files", self.output_files)
+        return self.status()
+
+    def cancel(self):
+        """
+        Richiede l'annullamento del job (anche se non ancora inviato).
+        Restituisce False se la richiesta al server non è andata a buon fine:
+        il motivo resta in 'message', il job continua a essere seguito e
+        l'annullamento può essere ritentato.
+        """
+        if self.job_id is not None and self.state not in TERMINAL_STATES:
+            try:
+                response = self.session.post(f"{API_BASE_URL}/cancel_job/{self.job_id}", timeout=LIST_TIMEOUT)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                self.message = f"Impossibile annullare il job {self.job_id}: {e}"
+                return False
+        # Il polling si ferma solo dopo la conferma del server (o se il job non è ancora stato inviato)
+        self._cancel_event.set()
+        return True
+
+    def _poll_with_retry(self, progress_callback):
+        """
+        Un'interrogazione dello stato. Gli errori transitori (timeout, 5xx,
+        connessione caduta) non interrompono il job, che continua sul server:
+        si riprova con attesa crescente e si rinuncia solo dopo
+        JOB_POLL_MAX_FAILURES errori consecutivi, mantenendo 'job_id' per
+        poterlo ancora annullare.
+        """
+        try:
+            if self.poll_failures:
+                self.message = ""  # Il messaggio del nuovo tentativo non vale più
+            self.poll()
+            self.poll_failures = 0
+        except requests.exceptions.RequestException as e:
+            if not is_transient_error(e):
+                raise
+            self.poll_failures += 1
+            if self.poll_failures >= JOB_POLL_MAX_FAILURES:
+                raise requests.exceptions.RequestException(
+                    f"Stato del job {self.job_id} non raggiungibile dopo {self.poll_failures} tentativi "
+                    f"(il server potrebbe essere ancora al lavoro): {e}")
+            self.message = f"Stato non raggiungibile ({e}), nuovo tentativo {self.poll_failures}/{JOB_POLL_MAX_FAILURES}"
+            if progress_callback:
+                progress_callback(self.status())
+            # Attesa aggiuntiva oltre al normale intervallo di polling
+            self._cancel_event.wait(min(self.poll_interval * 2 ** (self.poll_failures - 1), POLL_MAX_DELAY))
+
+    def run(self, progress_callback=None):
+        """
+        Invia il job e ne segue l'avanzamento fino al termine.
+        'progress_callback(status)' viene invocato a ogni aggiornamento.
+        Solleva RequestException se il job fallisce sul server o se il suo stato
+        resta irraggiungibile (in quel caso 'job_id' permette ancora di annullarlo).
+        """
+        if self.cancelled:
+            self.state = "cancelled"
+            return self.status()
+
+        try:
+            self.submit()
+            if self.cancelled:
+                # Annullato durante l'invio: inoltra la richiesta al server. Se non
+                # va a buon fine il job prosegue e resta annullabile
+                self._cancel_event.clear()
+                self.cancel()
+            if progress_callback:
+                progress_callback(self.status())
+
+            while self.state not in TERMINAL_STATES:
+                if self._cancel_event.wait(self.poll_interval):
+                    self.state = "cancelled"
+                    break
+                self._poll_with_retry(progress_callback)
+                if progress_callback and not self.poll_failures:
+                    progress_callback(self.status())
+        finally:
+            if self._submission is not None:
+                self.registry.finish_submission(self._submission, self.job_id, self.output_files)
+
+        if self.state == "failed":
+            raise requests.exceptions.RequestException(f"Job {self.job_id} fallito: {self.message}")
+        return self.status()
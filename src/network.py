@@ -0,0 +1,673 @@
+# src/network.py
+
+"""
+Modulo per la comunicazione HTTP con il server: sessione condivisa con
+pool di connessioni keep-alive, listing incrementale dei file e recupero
+parallelo dei file selezionati, anche come unico archivio tar in streaming.
+I download dei singoli file sono riprendibili: un trasferimento interrotto
+continua dai byte già ricevuti con una richiesta Range. I documenti possono
+arrivare compressi con le codifiche che requests dichiara di default in
+Accept-Encoding (gzip e deflate; br e zstd se urllib3 ha i decoder): vengono
+decompressi al volo durante la scrittura su disco e per ogni file si tiene
+conto dei byte trasferiti sulla rete rispetto a quelli del contenuto.
+"""
+
+import json
+import os
+from email.utils import formatdate
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+import urllib3
+
+from src.config import (API_BASE_URL, ARCHIVE_COMPRESSION, ARCHIVE_MIN_FILES, FETCH_MAX_RETRIES, FETCH_MAX_WORKERS,
+                        FETCH_PARALLEL_MIN_BYTES, FETCH_RANGE_PARTS, FETCH_RETRY_BACKOFF, FETCH_TIMEOUT,
+                        LIST_TIMEOUT)
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Attesa massima (secondi) tra due tentativi di un download interrotto
+RETRY_MAX_DELAY = 30
+
+MIME_TYPES = {'png': 'image/png', 'jpg': 'image/jpeg', 'txt': 'text/plain', 'json': 'application/json'}
+
+# Risposte di /get_archive che indicano un server senza supporto agli archivi
+ARCHIVE_UNSUPPORTED_STATUS = (404, 405, 501)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Restituisce la sessione HTTP condivisa, creandola al primo utilizzo.
+    Il pool di connessioni è dimensionato sul numero massimo di richieste
+    contemporanee (worker per intervalli paralleli), così ogni thread riutilizza
+    una connessione keep-alive invece di rifare l'handshake.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # Ogni worker può scaricare un file grande in FETCH_RANGE_PARTS intervalli paralleli
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(FETCH_MAX_WORKERS * max(1, FETCH_RANGE_PARTS), 10))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def guess_mime_type(filename):
+    """Restituisce il MIME type in base all'estensione del file."""
+    ext = filename.lower().split('.')[-1]
+    return MIME_TYPES.get(ext, 'application/octet-stream')
+
+
+def local_path_for(base_dir, filename):
+    """
+    Restituisce il percorso locale di 'filename' all'interno di 'base_dir',
+    rifiutando i percorsi del server che tenterebbero di uscirne.
+    """
+    base_dir = os.path.abspath(base_dir)
+    target = os.path.abspath(os.path.join(base_dir, filename.replace("/", os.sep)))
+    if os.path.commonpath([base_dir, target]) != base_dir:
+        raise ValueError(f"Percorso non valido: {filename}")
+    return target
+
+
+def is_transient_error(error):
+    """True per gli errori che vale la pena ritentare (rete, timeout, 429 e 5xx)."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                          requests.exceptions.ChunkedEncodingError)):
+        return True
+    response = getattr(error, "response", None)
+    return response is not None and (response.status_code == 429 or response.status_code >= 500)
+
+
+def summarize_transfers(files):
+    """
+    Statistiche di trasferimento dei file scaricati (i dettagli restituiti da
+    FileFetcher): byte del contenuto, byte transitati sulla rete e quota
+    risparmiata dalla compressione. I file serviti dalla cache sono esclusi.
+    """
+    downloaded = [details for details in files if not details.get("cached")]
+    size = sum(details["size"] for details in downloaded)
+    wire_bytes = sum(details.get("wire_bytes", details["size"]) for details in downloaded)
+    return {
+        "files": len(downloaded),
+        "size": size,
+        "wire_bytes": wire_bytes,
+        "saved_fraction": 1 - wire_bytes / size if size else 0.0,
+    }
+
+
+def format_transfer_summary(summary):
+    """Riepilogo leggibile di 'summarize_transfers()'."""
+    return (f"{summary['wire_bytes'] / 1024 ** 2:.1f} MB trasferiti per {summary['size'] / 1024 ** 2:.1f} MB di dati "
+            f"(risparmio {summary['saved_fraction']:.0%})")
+
+
+class ArchiveNotSupported(requests.exceptions.RequestException):
+    """Il server non espone l'endpoint /get_archive."""
+
+
+class ArchiveInterrupted(requests.exceptions.ConnectionError):
+    """
+    Il flusso dell'archivio si è interrotto o è corrotto. 'partial' contiene i
+    file già estratti ({"files": ..., "errors": ...}), che non vanno riscaricati.
+    """
+    def __init__(self, message, partial):
+        super().__init__(message)
+        self.partial = partial
+
+
+class _RestartDownload(Exception):
+    """Il file parziale non è più utilizzabile: il download deve ripartire da zero."""
+
+
+def _range_validator(headers):
+    """Validatore per If-Range: un ETag forte o, in mancanza, Last-Modified."""
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+def _parse_content_range(value):
+    """Da 'bytes 100-199/1000' restituisce (100, 1000); il totale è None se sconosciuto ('*')."""
+    try:
+        unit, _, spec = value.partition(" ")
+        span, _, total = spec.partition("/")
+        if unit != "bytes":
+            raise ValueError(value)
+        return int(span.split("-")[0]), (None if total == "*" else int(total))
+    except (AttributeError, ValueError):
+        raise _RestartDownload(f"Content-Range non valido: {value!r}")
+
+
+def _identity_length(response):
+    """Dimensione del contenuto, se nota: con una codifica di trasferimento (es. gzip) Content-Length non la indica."""
+    if response.headers.get("Content-Encoding", "identity") != "identity":
+        return None
+    length = response.headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+def _state_path(partial_path):
+    return partial_path + ".json"
+
+
+def _load_partial_state(partial_path):
+    """Metadati del download parziale (validatore, dimensione, intervalli mancanti); {} se non riprendibile."""
+    if not os.path.exists(partial_path):
+        return {}
+    try:
+        with open(_state_path(partial_path), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) and state.get("validator") else {}
+
+
+def _save_partial_state(partial_path, state):
+    tmp_path = _state_path(partial_path) + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, _state_path(partial_path))
+
+
+def _discard_partial(partial_path):
+    for path in (partial_path, _state_path(partial_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _received_bytes(partial_path, state):
+    """Byte del file già ricevuti, per capire se un tentativo fallito ha fatto progressi."""
+    if state.get("segments"):
+        return state["total"] - sum(end + 1 - start for start, end in state["segments"] if start <= end)
+    return os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+
+
+class FileListing:
+    """
+    Mantiene l'ultimo listing del server e lo aggiorna in modo incrementale.
+    Se il server supporta il parametro 'since' risponde solo con le differenze
+    ("added"/"removed") rispetto al cursore; altrimenti restituisce la lista
+    completa e le differenze vengono calcolate localmente. Un ETag sul listing
+    permette inoltre di ricevere un 304 quando nulla è cambiato.
+    """
+    def __init__(self, session=None, timeout=LIST_TIMEOUT):
+        self.session = session or get_session()
+        self.timeout = timeout
+        self.files = []
+        self.cursor = None
+        self.etag = None
+        self.loaded = False  # True dopo il primo listing applicato
+
+    def reset(self):
+        """Dimentica lo stato: il prossimo refresh scaricherà il listing completo."""
+        self.files, self.cursor, self.etag = [], None, None
+        self.loaded = False
+
+    def refresh(self):
+        """
+        Aggiorna il listing e restituisce un dizionario
+        {"added": [...], "removed": [...], "files": [...], "baseline": bool}.
+        Con "baseline" True il listing è il primo: "added" contiene tutti i
+        file del server, non solo quelli nuovi.
+        """
+        return self.apply(self.fetch())
+
+    def fetch(self):
+        """
+        Esegue solo la richiesta di rete, senza modificare lo stato: può girare
+        in un thread di background e il risultato può essere scartato se la
+        richiesta viene annullata. Va poi passato ad 'apply()'.
+        """
+        since, etag = self.cursor, self.etag
+        params = {"since": since} if since else None
+        headers = {"If-None-Match": etag} if etag else None
+        response = self.session.get(f"{API_BASE_URL}/list_files", params=params, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return {"since": since, "data": None, "etag": etag}
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") != "success":
+            raise requests.exceptions.RequestException(f"Errore API: {data.get('message')}")
+        return {"since": since, "data": data, "etag": response.headers.get("ETag")}
+
+    def apply(self, result):
+        """Applica il risultato di 'fetch()' e restituisce le differenze."""
+        data = result["data"]
+        if data is None:
+            return {"added": [], "removed": [], "files": list(self.files), "baseline": False}
+
+        is_delta = "files" not in data and ("added" in data or "removed" in data)
+        if is_delta and result["since"] != self.cursor:
+            raise requests.exceptions.RequestException("Listing incrementale non più valido, riprovare.")
+
+        if is_delta:
+            known = set(self.files)
+            added = [path for path in data.get("added", []) if path not in known]
+            removed = set(data.get("removed", [])) & known
+        else:
+            new_files = data.get("files", [])
+            new_set, old_set = set(new_files), set(self.files)
+            added = [path for path in new_files if path not in old_set]
+            removed = old_set - new_set
+
+        if removed:
+            self.files = [path for path in self.files if path not in removed]
+        self.files.extend(added)
+        self.cursor = data.get("cursor")
+        self.etag = result["etag"]
+        baseline, self.loaded = not self.loaded, True
+        return {"added": added, "removed": sorted(removed), "files": list(self.files), "baseline": baseline}
+
+
+class FileFetcher:
+    """
+    Recupera uno o più documenti dal server usando la sessione condivisa.
+    I file vengono scritti a blocchi su disco: nei risultati restano solo il
+    percorso locale e i metadati, mai il contenuto in memoria. Se è presente
+    una 'DocumentCache', i file già noti vengono rivalidati con una GET
+    condizionale e riscaricati solo se sono cambiati sul server. I download
+    interrotti vengono ripresi (vedi '_download_resumable').
+    I percorsi in cache restituiti da una richiesta restano validi fino alla
+    richiesta successiva dello stesso fetcher (o a 'release()'): fino ad allora
+    le voci sono fissate e l'eviction non le tocca.
+    """
+    def __init__(self, download_dir, cache=None, session=None, max_workers=FETCH_MAX_WORKERS, timeout=FETCH_TIMEOUT,
+                 retries=FETCH_MAX_RETRIES):
+        self.download_dir = download_dir
+        self.cache = cache
+        self.session = session or get_session()
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = timeout
+        self.retries = max(0, int(retries))
+        self.archive_supported = None  # None finché non si è provato /get_archive
+        self._held = set()  # Voci della cache fissate dalla richiesta corrente
+        self._held_lock = threading.Lock()
+
+    def release(self):
+        """Rilascia le voci della cache fissate dall'ultima richiesta, che tornano soggette all'eviction."""
+        if self.cache is None:
+            return
+        with self._held_lock:
+            held, self._held = self._held, set()
+        self.cache.unpin(held)
+
+    def _hold(self, filename):
+        """Fissa in cache 'filename' fino alla prossima richiesta, così il percorso restituito resta valido."""
+        with self._held_lock:
+            if filename in self._held:
+                return
+            self._held.add(filename)
+        self.cache.pin([filename])
+
+    def fetch_one(self, filename):
+        """Scarica un singolo file e ne restituisce i dettagli."""
+        self.release()
+        try:
+            return self._fetch(filename)
+        finally:
+            if self.cache:
+                self.cache.save()
+
+    def _fetch(self, filename):
+        transfer = {"wire_bytes": 0, "content_encoding": "identity"}
+        if self.cache is None:
+            path, size = self._download_to_dir(filename, transfer)
+            cached = False
+        else:
+            path, size, cached = self._fetch_through_cache(filename, transfer)
+        return {
+            "path": path,
+            "size": size,
+            "mime_type": guess_mime_type(filename),
+            "cached": cached,
+            "wire_bytes": transfer["wire_bytes"],
+            "content_encoding": transfer["content_encoding"]
+        }
+
+    def _fetch_through_cache(self, filename, transfer):
+        self._hold(filename)
+        entry = self.cache.lookup(filename)
+        headers = self.cache.conditional_headers(entry) if entry else {}
+        partial_path = self.cache.partial_path(filename)
+        validators = self._download_resumable(filename, partial_path, headers, transfer)
+        if validators is None:
+            touched = self.cache.touch(filename)
+            if touched is not None:
+                return touched[0], touched[1], True
+            # La voce è sparita dopo la rivalidazione: si riscarica senza GET condizionale
+            validators = self._download_resumable(filename, partial_path, transfer=transfer)
+        path, size = self.cache.store_file(filename, partial_path, validators)
+        return path, size, False
+
+    def _download_to_dir(self, filename, transfer):
+        target_path = local_path_for(self.download_dir, filename)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        partial_path = target_path + ".part"
+        self._download_resumable(filename, partial_path, transfer=transfer)
+        os.replace(partial_path, target_path)
+        return target_path, os.path.getsize(target_path)
+
+    def _download_resumable(self, filename, partial_path, headers=None, transfer=None):
+        """
+        Scarica '/get_document/<filename>' in 'partial_path'. Accanto al file
+        parziale un '.json' conserva il validatore (ETag o Last-Modified) e la
+        dimensione attesa, così un trasferimento interrotto, anche in una sessione
+        precedente, riprende dai byte già ricevuti con Range/If-Range; se il file
+        è cambiato sul server il download riparte da zero. Gli errori transitori
+        vengono ritentati con attesa esponenziale, azzerando il conteggio a ogni
+        tentativo che ha fatto progressi; se ci si arrende il file parziale resta
+        su disco per la volta successiva. 'headers' (GET condizionale) vale solo
+        per i download da zero. In 'transfer' vengono sommati i byte ricevuti
+        sulla rete ("wire_bytes", compressi o no) e annotata la codifica usata.
+        Restituisce {"ETag", "Last-Modified"} del file completo, o None se il
+        server ha risposto 304.
+        """
+        url = f"{API_BASE_URL}/get_document/{filename}"
+        transfer = transfer if transfer is not None else {"wire_bytes": 0, "content_encoding": "identity"}
+        state = _load_partial_state(partial_path)
+        failures = 0
+        while True:
+            received = _received_bytes(partial_path, state)
+            try:
+                if not self._download_attempt(url, partial_path, state, headers, transfer):
+                    return None
+                break
+            except _RestartDownload as e:
+                _discard_partial(partial_path)
+                state = {}
+                failures += 1
+                if failures > self.retries:
+                    raise requests.exceptions.RequestException(f"Download di {filename} non riuscito: {e}")
+            except requests.exceptions.RequestException as e:
+                if not is_transient_error(e):
+                    _discard_partial(partial_path)
+                    raise
+                failures = 0 if _received_bytes(partial_path, state) > received else failures + 1
+                if failures > self.retries:
+                    raise
+                time.sleep(min(FETCH_RETRY_BACKOFF * 2 ** failures, RETRY_MAX_DELAY))
+
+        if os.path.exists(_state_path(partial_path)):
+            os.remove(_state_path(partial_path))
+        return {"ETag": state.get("etag"), "Last-Modified": state.get("last_modified")}
+
+    def _download_attempt(self, url, partial_path, state, headers, transfer):
+        """
+        Un singolo tentativo: riprende il file parziale descritto da 'state'
+        (aggiornato sul posto) o lo scarica da zero. Restituisce False per un 304.
+        """
+        if state.get("segments"):
+            self._download_segments(url, partial_path, state, transfer)
+            return True
+        offset = os.path.getsize(partial_path) if state and os.path.exists(partial_path) else 0
+        if offset:
+            # La codifica identity garantisce che gli offset siano quelli del file su disco
+            request_headers = {"Range": f"bytes={offset}-", "If-Range": state["validator"], "Accept-Encoding": "identity"}
+        else:
+            request_headers = dict(headers or {})
+
+        with self.session.get(url, headers=request_headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and not offset:
+                return False
+            if response.status_code == 416:
+                if offset and offset == state.get("total"):
+                    return True  # Il file parziale era già completo
+                raise _RestartDownload("intervallo richiesto non valido")
+            response.raise_for_status()
+
+            if response.status_code == 206:
+                start, total = _parse_content_range(response.headers.get("Content-Range"))
+                if start != offset:
+                    raise _RestartDownload("il server ha restituito un intervallo diverso da quello richiesto")
+            else:
+                # Risposta completa: primo download, server senza Range o file cambiato
+                offset, total = 0, _identity_length(response)
+                state.clear()
+                state.update(validator=_range_validator(response.headers), total=total,
+                             etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified"))
+                if (total and total >= FETCH_PARALLEL_MIN_BYTES and FETCH_RANGE_PARTS > 1 and state["validator"]
+                        and response.headers.get("Accept-Ranges") == "bytes"):
+                    parts = FETCH_RANGE_PARTS
+                    state["segments"] = [[i * total // parts, (i + 1) * total // parts - 1] for i in range(parts)]
+                    with open(partial_path, 'wb') as f:
+                        f.truncate(total)
+                elif not state["validator"]:
+                    state.clear()  # Senza validatore il file parziale non si può riprendere
+                if state:
+                    _save_partial_state(partial_path, state)
+
+            if not state.get("segments"):
+                # iter_content decomprime al volo: su disco arriva sempre il contenuto originale
+                transfer["content_encoding"] = response.headers.get("Content-Encoding", "identity")
+                try:
+                    with open(partial_path, 'ab' if offset else 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                finally:
+                    transfer["wire_bytes"] += response.raw.tell()
+
+        if state.get("segments"):
+            self._download_segments(url, partial_path, state, transfer)
+            return True
+        size = os.path.getsize(partial_path)
+        if total is not None and size > total:
+            raise _RestartDownload(f"ricevuti {size} byte invece di {total}")
+        if total is not None and size < total:
+            raise requests.exceptions.ChunkedEncodingError(f"Trasferimento interrotto a {size} di {total} byte.")
+        return True
+
+    def _download_segments(self, url, partial_path, state, transfer):
+        """
+        Scarica in parallelo gli intervalli mancanti ('state["segments"]', coppie
+        [inizio, fine] aggiornate man mano) di un file grande già preallocato in
+        'partial_path'. I progressi vengono salvati anche se un intervallo fallisce.
+        """
+        transfer_lock = threading.Lock()
+
+        def fetch_segment(segment):
+            headers = {"Range": f"bytes={segment[0]}-{segment[1]}", "If-Range": state["validator"],
+                       "Accept-Encoding": "identity"}
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 416:
+                    raise _RestartDownload("intervallo richiesto non valido")
+                response.raise_for_status()
+                if response.status_code != 206 or _parse_content_range(response.headers.get("Content-Range"))[0] != segment[0]:
+                    raise _RestartDownload("il file è cambiato sul server durante il download")
+                try:
+                    with open(partial_path, 'r+b') as f:
+                        f.seek(segment[0])
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            chunk = chunk[:segment[1] + 1 - segment[0]]
+                            f.write(chunk)
+                            segment[0] += len(chunk)
+                finally:
+                    with transfer_lock:
+                        transfer["wire_bytes"] += response.raw.tell()
+            if segment[0] <= segment[1]:
+                raise requests.exceptions.ChunkedEncodingError(f"Intervallo interrotto a {segment[0]} di {segment[1] + 1} byte.")
+
+        pending = [segment for segment in state["segments"] if segment[0] <= segment[1]]
+        try:
+            if pending:
+                with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                    for future in [executor.submit(fetch_segment, segment) for segment in pending]:
+                        future.result()
+        finally:
+            state["segments"] = [segment for segment in state["segments"] if segment[0] <= segment[1]]
+            _save_partial_state(partial_path, state)
+
+    def _write_to_dir(self, filename, chunks):
+        """Scrive i blocchi in un file '.part' e lo rinomina solo a scrittura completata."""
+        target_path = local_path_for(self.download_dir, filename)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        partial_path = target_path + ".part"
+
+        size = 0
+        try:
+            with open(partial_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+        os.replace(partial_path, target_path)
+        return target_path, size
+
+    def fetch_archive(self, prefix, expected_total=0, progress_callback=None):
+        """
+        Scarica in un'unica richiesta tutti i file sotto la cartella 'prefix'
+        (GET /get_archive, tar eventualmente compresso) e li estrae mentre arrivano:
+        nella cache se presente, altrimenti in 'download_dir'. I nomi nell'archivio
+        sono i percorsi del server; in cache ogni file riceve come validatore
+        (Last-Modified) la data di modifica registrata nell'archivio, così i
+        download successivi possono essere GET condizionali. Solleva ArchiveNotSupported se il server non
+        ha l'endpoint, ArchiveInterrupted (con i file già estratti) se il flusso si interrompe. Restituisce {"files": ..., "errors": ...} come 'fetch_many';
+        i byte di rete di ogni file sono la quota di flusso letta per estrarlo
+        (approssimata alla granularità dei blocchi letti da tarfile).
+        """
+        self.release()
+        return self._fetch_archive(prefix, expected_total, progress_callback)
+
+    def _fetch_archive(self, prefix, expected_total, progress_callback):
+        params = {"path": prefix, "format": "tar", "compression": ARCHIVE_COMPRESSION}
+        mode = "r|gz" if ARCHIVE_COMPRESSION == "gz" else "r|"
+        files_found, errors = {}, {}
+        with self.session.get(f"{API_BASE_URL}/get_archive", params=params, timeout=self.timeout, stream=True) as response:
+            if response.status_code in ARCHIVE_UNSUPPORTED_STATUS:
+                self.archive_supported = False
+                raise ArchiveNotSupported(f"Archivi non supportati dal server (HTTP {response.status_code}).")
+            response.raise_for_status()
+            self.archive_supported = True
+            response.raw.decode_content = True
+            encoding = "gzip" if mode == "r|gz" else response.headers.get("Content-Encoding", "identity")
+            try:
+                self._extract_archive(response, mode, encoding, files_found, errors, expected_total, progress_callback)
+            except (urllib3.exceptions.HTTPError, tarfile.TarError, OSError) as e:
+                # Socket chiuso o in stallo a metà (errori di urllib3, non di requests) o tar troncato
+                raise ArchiveInterrupted(str(e), {"files": files_found, "errors": errors}) from e
+            finally:
+                if self.cache:
+                    self.cache.save()
+        return {"files": files_found, "errors": errors}
+
+    def _extract_archive(self, response, mode, encoding, files_found, errors, expected_total, progress_callback):
+        """Estrae i membri del tar man mano che arrivano, riempiendo 'files_found' ed 'errors'."""
+        wire_mark = 0
+        with tarfile.open(fileobj=response.raw, mode=mode) as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue  # Cartelle, link e file speciali vengono ignorati
+                filename = member.name.removeprefix("./")
+                error = None
+                try:
+                    source = archive.extractfile(member)
+                    chunks = iter(lambda: source.read(DOWNLOAD_CHUNK_SIZE), b"")
+                    if self.cache is None:
+                        path, size = self._write_to_dir(filename, chunks)
+                    else:
+                        self._hold(filename)
+                        validators = {"Last-Modified": formatdate(member.mtime, usegmt=True)} if member.mtime else {}
+                        path, size = self.cache.store(filename, chunks, validators)
+                    files_found[filename] = {"path": path, "size": size, "mime_type": guess_mime_type(filename), "cached": False,
+                                             "wire_bytes": response.raw.tell() - wire_mark, "content_encoding": encoding}
+                except (OSError, ValueError) as e:
+                    error = str(e)
+                    errors[filename] = error
+                wire_mark = response.raw.tell()
+                if progress_callback:
+                    done = len(files_found) + len(errors)
+                    progress_callback(done, max(expected_total, done), filename, error)
+
+    def fetch_tree(self, prefix, filenames, progress_callback=None):
+        """
+        Scarica i file 'filenames' (tutti quelli sotto 'prefix') preferendo un unico
+        archivio. L'archivio si usa solo se almeno ARCHIVE_MIN_FILES file non sono
+        già in cache con un validatore: altrimenti conviene rivalidare i file uno
+        per uno con GET condizionali. Se il server non supporta gli archivi, o il
+        trasferimento si interrompe, i file mancanti vengono recuperati con
+        'fetch_many'; nel secondo caso il motivo è riportato in "archive_error".
+        """
+        self.release()
+        result = {"files": {}, "errors": {}}
+        archive_error = None
+        if self.archive_supported is not False and len(self._without_validator(filenames)) >= ARCHIVE_MIN_FILES:
+            try:
+                result = self._fetch_archive(prefix, len(filenames), progress_callback)
+            except ArchiveNotSupported:
+                pass
+            except ArchiveInterrupted as e:
+                # I file già estratti restano validi: si recuperano solo quelli mancanti
+                result = e.partial
+                archive_error = f"Archivio interrotto ({e}): file mancanti recuperati uno per uno."
+            except requests.exceptions.RequestException as e:
+                archive_error = f"Archivio interrotto ({e}): file mancanti recuperati uno per uno."
+
+        missing = [name for name in filenames if name not in result["files"]]
+        if missing:
+            rest = self._fetch_many(missing, progress_callback)
+            result["files"].update(rest["files"])
+            result["errors"] = {name: error for name, error in {**result["errors"], **rest["errors"]}.items()
+                                if name not in result["files"]}
+
+        ordered_files = {name: result["files"][name] for name in filenames if name in result["files"]}
+        ordered_files.update((name, details) for name, details in result["files"].items() if name not in ordered_files)
+        return {"files": ordered_files, "errors": result["errors"], "archive_error": archive_error}
+
+    def _without_validator(self, filenames):
+        """File che non sono in cache con un ETag o un Last-Modified da rivalidare (tutti, senza cache)."""
+        if self.cache is None:
+            return list(filenames)
+        missing = []
+        for name in filenames:
+            entry = self.cache.lookup(name)
+            if not entry or not (entry.get("etag") or entry.get("last_modified")):
+                missing.append(name)
+        return missing
+
+    def fetch_many(self, filenames, progress_callback=None):
+        """
+        Scarica i file in parallelo. 'progress_callback(done, total, filename, error)'
+        viene invocato dal thread del worker al termine di ogni file.
+        Restituisce un dizionario {"files": ..., "errors": ...}.
+        """
+        self.release()
+        return self._fetch_many(filenames, progress_callback)
+
+    def _fetch_many(self, filenames, progress_callback):
+        files_found, errors = {}, {}
+        total = len(filenames)
+        if not total:
+            return {"files": files_found, "errors": errors}
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, total)) as executor:
+            futures = {executor.submit(self._fetch, name): name for name in filenames}
+            for done, future in enumerate(as_completed(futures), 1):
+                filename = futures[future]
+                error = None
+                try:
+                    files_found[filename] = future.result()
+                except (requests.exceptions.RequestException, OSError, ValueError) as e:
+                    error = str(e)
+                    errors[filename] = error
+                if progress_callback:
+                    progress_callback(done, total, filename, error)
+
+        if self.cache:
+            self.cache.save()
+
+        # Mantiene l'ordine di selezione originale per la lista dei risultati
+        ordered_files = {name: files_found[name] for name in filenames if name in files_found}
+        return {"files": ordered_files, "errors": errors}
@@ -0,0 +1,277 @@
+# src/pointcloud.py
+
+"""
+Modulo per il caricamento delle nuvole di punti con sola NumPy.
+I file .npy vengono mappati in memoria (mmap) e convertiti in un solo
+passaggio negli array contigui float64 richiesti da Open3D. Contiene anche
+il sottocampionamento per i livelli di dettaglio (LOD) del visualizzatore,
+un lettore .pcd e il rendering di proiezioni 2D senza Open3D.
+"""
+
+import time
+import tracemalloc
+
+import numpy as np
+
+# Righe elaborate per blocco durante la copia/normalizzazione dei colori
+COLOR_CHUNK_ROWS = 1 << 20
+
+
+def load_npy_point_cloud(file_path, chunk_rows=COLOR_CHUNK_ROWS, measure_memory=False):
+    """
+    Carica un .npy con colonne [x, y, z(, r, g, b)] senza leggere tutto il file in RAM.
+    Restituisce (points, colors, stats): 'colors' è None se il file non ha colori,
+    'stats' contiene numero di punti, tempo di caricamento e, con 'measure_memory',
+    il picco di memoria ("peak_mb", altrimenti None). La misura usa tracemalloc,
+    che rallenta ogni allocazione e vale per tutto il processo: va richiesta solo
+    nei benchmark, mai nei caricamenti dell'interfaccia.
+    """
+    tracing = measure_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        array = np.load(file_path, mmap_mode='r', allow_pickle=False)
+        if not isinstance(array, np.ndarray) or array.ndim != 2 or array.shape[1] < 3:
+            raise ValueError("Il file .npy non contiene un array 2D valido.")
+
+        num_points = array.shape[0]
+        points = np.empty((num_points, 3), dtype=np.float64)
+        points[:] = array[:, :3]
+
+        colors = None
+        if array.shape[1] >= 6:
+            # Copia a blocchi dal file mappato, tenendo traccia del massimo per la normalizzazione
+            colors = np.empty((num_points, 3), dtype=np.float64)
+            max_value = 0.0
+            for row in range(0, num_points, chunk_rows):
+                block = colors[row:row + chunk_rows]
+                block[:] = array[row:row + chunk_rows, 3:6]
+                if block.size:
+                    max_value = max(max_value, float(block.max()))
+            if max_value > 1.0:
+                colors *= 1.0 / 255.0
+        del array
+
+        load_s = time.perf_counter() - start
+        peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024) if measure_memory else None
+        stats = {
+            "points": num_points,
+            "load_s": load_s,
+            "peak_mb": peak_mb
+        }
+        return points, colors, stats
+    finally:
+        if tracing:
+            tracemalloc.stop()
+
+
+def lod_levels(num_points, budget, factor=4):
+    """
+    Numero di punti di ogni livello di dettaglio, dall'anteprima entro 'budget'
+    fino alla risoluzione piena (es. 200k, 800k, 1.2M).
+    """
+    if budget <= 0 or num_points <= budget:
+        return [num_points]
+    levels = []
+    level = budget
+    while level < num_points:
+        levels.append(level)
+        level *= factor
+    levels.append(num_points)
+    return levels
+
+
+def _voxel_first_indices(points, mins, voxel_size):
+    """Indice del primo punto di ogni voxel occupato."""
+    cells = np.floor((points - mins) / voxel_size).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    _, first_indices = np.unique(keys, return_index=True)
+    first_indices.sort()
+    return first_indices
+
+
+def downsample_indices(points, budget, method="voxel", seed=0):
+    """
+    Restituisce gli indici (ordinati) di al più 'budget' punti, oppure None se
+    la nuvola rientra già nel budget. Il metodo "voxel" tiene un punto per cella
+    di una griglia dimensionata sul budget, "random" un campione uniforme.
+    """
+    num_points = len(points)
+    if budget <= 0 or num_points <= budget:
+        return None
+    rng = np.random.default_rng(seed)
+    if method == "random":
+        return np.sort(rng.choice(num_points, budget, replace=False))
+
+    mins = points.min(axis=0)
+    extents = np.sort(points.max(axis=0) - mins)
+    # Le nuvole da sensore sono superfici (2.5D): la cella si stima sulle due estensioni maggiori
+    area = extents[2] * max(extents[1], extents[2] * 1e-6)
+    if area <= 0:
+        return np.sort(rng.choice(num_points, budget, replace=False))
+    voxel_size = np.sqrt(area / budget)
+
+    indices = _voxel_first_indices(points, mins, voxel_size)
+    for _ in range(2):
+        if len(indices) >= budget // 2:
+            break
+        # Troppo pochi voxel occupati: si riduce la cella in proporzione
+        voxel_size *= np.sqrt(len(indices) / budget)
+        indices = _voxel_first_indices(points, mins, voxel_size)
+
+    if len(indices) > budget:
+        indices = np.sort(rng.choice(indices, budget, replace=False))
+    return indices
+
+
+# Tipi dei campi PCD: (TYPE, SIZE) -> dtype NumPy
+_PCD_DTYPES = {
+    ('F', 4): np.float32, ('F', 8): np.float64,
+    ('U', 1): np.uint8, ('U', 2): np.uint16, ('U', 4): np.uint32, ('U', 8): np.uint64,
+    ('I', 1): np.int8, ('I', 2): np.int16, ('I', 4): np.int32, ('I', 8): np.int64,
+}
+
+
+def read_pcd_arrays(file_path):
+    """
+    Legge un file .pcd (DATA ascii o binary) e restituisce (points, colors).
+    Il formato binary_compressed non è supportato.
+    """
+    header = {}
+    with open(file_path, 'rb') as f:
+        while True:
+            line = f.readline()
+            if not line:
+                raise ValueError("Header PCD incompleto.")
+            line = line.decode('ascii', errors='replace').strip()
+            if not line or line.startswith('#'):
+                continue
+            key, _, value = line.partition(' ')
+            header[key.upper()] = value.split()
+            if key.upper() == 'DATA':
+                break
+        data_offset = f.tell()
+
+    fields = header.get('FIELDS', [])
+    sizes = [int(v) for v in header.get('SIZE', [])]
+    types = header.get('TYPE', [])
+    counts = [int(v) for v in header.get('COUNT', ['1'] * len(fields))]
+    num_points = int(header.get('POINTS', ['0'])[0])
+    data_format = header['DATA'][0].lower()
+    if not {'x', 'y', 'z'} <= set(fields):
+        raise ValueError("Il file .pcd non contiene i campi x, y, z.")
+
+    if data_format == 'binary':
+        dtype = np.dtype([(name, _PCD_DTYPES[(t, size)], (count,)) if count > 1 else (name, _PCD_DTYPES[(t, size)])
+                          for name, t, size, count in zip(fields, types, sizes, counts)])
+        data = np.memmap(file_path, dtype=dtype, mode='r', offset=data_offset, shape=(num_points,))
+        columns = {name: data[name] for name in fields}
+    elif data_format == 'ascii':
+        with open(file_path, 'rb') as f:
+            header_lines = f.read(data_offset).count(b'\n')
+        table = np.loadtxt(file_path, skiprows=header_lines, ndmin=2, max_rows=num_points)
+        columns, index = {}, 0
+        for name, count in zip(fields, counts):
+            column = table[:, index:index + count]
+            columns[name] = column[:, 0] if count == 1 else column
+            index += count
+        for name in ('rgb', 'rgba'):
+            if name in columns:
+                # Il colore impacchettato è un float32 salvato come testo
+                columns[name] = columns[name].astype(np.float32)
+    else:
+        raise ValueError(f"Formato PCD '{data_format}' non supportato.")
+
+    points = np.empty((num_points, 3), dtype=np.float64)
+    for axis, name in enumerate('xyz'):
+        points[:, axis] = columns[name]
+
+    colors = None
+    if 'rgb' in columns or 'rgba' in columns:
+        packed = np.ascontiguousarray(columns.get('rgb', columns.get('rgba'))).view(np.uint32)
+        colors = np.empty((num_points, 3), dtype=np.float64)
+        colors[:, 0] = (packed >> 16) & 0xFF
+        colors[:, 1] = (packed >> 8) & 0xFF
+        colors[:, 2] = packed & 0xFF
+        colors *= 1.0 / 255.0
+    elif {'r', 'g', 'b'} <= set(columns):
+        colors = np.stack([columns['r'], columns['g'], columns['b']], axis=1).astype(np.float64)
+        if colors.size and colors.max() > 1.0:
+            colors *= 1.0 / 255.0
+
+    valid = np.isfinite(points).all(axis=1)
+    if not valid.all():
+        points = points[valid]
+        colors = colors[valid] if colors is not None else None
+    return points, colors
+
+
+def load_point_cloud_arrays(file_path):
+    """Carica un .npy o un .pcd con sola NumPy e restituisce (points, colors)."""
+    file_ext = file_path.lower().split('.')[-1]
+    if file_ext == 'npy':
+        points, colors, _ = load_npy_point_cloud(file_path)
+    elif file_ext == 'pcd':
+        points, colors = read_pcd_arrays(file_path)
+    else:
+        raise ValueError(f"Formato file non supportato: {file_ext}")
+    if len(points) == 0:
+        raise ValueError("La nuvola di punti è vuota.")
+    return points, colors
+
+
+# Viste ortografiche: (asse orizzontale, asse verticale, asse di profondità, profondità crescente verso l'osservatore)
+PROJECTION_VIEWS = {
+    "top": (0, 1, 2, True),     # dall'alto: piano XY, visibile il punto con Z maggiore
+    "front": (0, 2, 1, False),  # di fronte: piano XZ, visibile il punto con Y minore
+    "side": (1, 2, 0, False),   # di lato: piano YZ, visibile il punto con X minore
+}
+
+
+def render_projection(points, colors, width, height, view="top", background=(30, 30, 30)):
+    """
+    Rasterizza la nuvola di punti in un'immagine RGB uint8 (height, width, 3)
+    con una proiezione ortografica e z-buffer vettorizzato. Senza colori,
+    i punti sono colorati in scala di grigi in base alla profondità.
+    """
+    h_axis, v_axis, d_axis, nearer_is_greater = PROJECTION_VIEWS[view]
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[:] = background
+    finite = np.isfinite(points).all(axis=1)
+    if not finite.all():
+        points = points[finite]
+        colors = colors[finite] if colors is not None else None
+    if len(points) == 0:
+        return image
+
+    u, v, depth = points[:, h_axis], points[:, v_axis], points[:, d_axis]
+    u_min, v_min = u.min(), v.min()
+    span = max(u.max() - u_min, v.max() - v_min, 1e-9)
+    u_span, v_span = u.max() - u_min, v.max() - v_min
+    scale = min((width - 1) / max(u_span, span * 1e-6), (height - 1) / max(v_span, span * 1e-6))
+    # Centra la nuvola nell'immagine mantenendo le proporzioni
+    u_offset = (width - 1 - u_span * scale) / 2
+    v_offset = (height - 1 - v_span * scale) / 2
+    cols = ((u - u_min) * scale + u_offset).astype(np.int64)
+    rows = (height - 1) - ((v - v_min) * scale + v_offset).astype(np.int64)
+    pixels = rows * width + cols
+
+    # Per ogni pixel si tiene il punto più vicino all'osservatore
+    nearness = depth if nearer_is_greater else -depth
+    order = np.lexsort((-nearness, pixels))
+    sorted_pixels = pixels[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_pixels[1:] != sorted_pixels[:-1]
+    winners = order[first]
+
+    if colors is not None:
+        rgb = np.clip(colors[winners] * 255.0, 0, 255).astype(np.uint8)
+    else:
+        d = depth[winners]
+        d_min, d_max = d.min(), d.max()
+        shade = (nearness[winners] - nearness[winners].min()) / max(d_max - d_min, 1e-9)
+        rgb = np.repeat((55 + shade * 200).astype(np.uint8)[:, None], 3, axis=1)
+    image.reshape(-1, 3)[pixels[winners]] = rgb
+    return image
@@ -0,0 +1,107 @@
+# src/previews.py
+
+"""
+Modulo per le anteprime 2D mostrate nel pannello del visualizzatore: nuvole di
+punti e mappe di profondità/segmentazione del replicator. Le immagini vengono
+generate con sola NumPy (nessuna finestra Open3D) e salvate su disco, una per
+file, vista e dimensione; le meno usate di recente vengono rimosse quando la
+cartella supera THUMBNAIL_CACHE_MAX_BYTES.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+
+from PIL import Image
+
+from src.annotators import render_annotator
+from src.config import CACHE_DIR, POINTCLOUD_THUMBNAIL_SIZE, THUMBNAIL_CACHE_MAX_BYTES
+from src.pointcloud import load_point_cloud_arrays, render_projection
+
+THUMBNAIL_DIR = os.path.join(CACHE_DIR, "thumbnails")
+
+
+def point_cloud_thumbnail(file_path, view="top", size=POINTCLOUD_THUMBNAIL_SIZE, cache_dir=THUMBNAIL_DIR):
+    """
+    Restituisce il percorso del PNG con la proiezione della nuvola di punti,
+    generandolo solo se non è già in cache. La chiave include dimensione e
+    data di modifica del file, quindi un file cambiato produce una nuova anteprima.
+    """
+    width, height = size
+    thumbnail_path = _thumbnail_path(file_path, f"{view}|{width}x{height}", cache_dir)
+    if os.path.exists(thumbnail_path):
+        _mark_used(thumbnail_path)
+        return thumbnail_path
+
+    points, colors = load_point_cloud_arrays(file_path)
+    _save_png(render_projection(points, colors, width, height, view=view), thumbnail_path)
+    prune_thumbnails(cache_dir)
+    return thumbnail_path
+
+
+def annotator_preview(file_path, kind, cache_dir=THUMBNAIL_DIR):
+    """
+    Restituisce (percorso PNG, statistiche) per una mappa di profondità o di
+    segmentazione. Le statistiche sono salvate accanto al PNG in un file JSON,
+    così un file già visto non viene più ricaricato.
+    """
+    thumbnail_path = _thumbnail_path(file_path, kind, cache_dir)
+    stats_path = thumbnail_path[:-len(".png")] + ".json"
+    if os.path.exists(thumbnail_path) and os.path.exists(stats_path):
+        try:
+            with open(stats_path, 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+            _mark_used(thumbnail_path, stats_path)
+            return thumbnail_path, stats
+        except (OSError, ValueError):
+            pass
+
+    image, stats = render_annotator(file_path, kind)
+    _save_png(image, thumbnail_path)
+    with open(stats_path, 'w', encoding='utf-8') as f:
+        json.dump(stats, f)
+    prune_thumbnails(cache_dir)
+    return thumbnail_path, stats
+
+
+def _thumbnail_path(file_path, variant, cache_dir):
+    """La chiave include dimensione e data di modifica del file sorgente."""
+    stat = os.stat(file_path)
+    key_source = f"{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}|{variant}"
+    return os.path.join(cache_dir, hashlib.sha1(key_source.encode('utf-8')).hexdigest() + ".png")
+
+
+def _save_png(image, thumbnail_path):
+    cache_dir = os.path.dirname(thumbnail_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = os.path.join(cache_dir, f"{uuid.uuid4().hex}.tmp.png")
+    Image.fromarray(image).save(tmp_path)
+    os.replace(tmp_path, thumbnail_path)
+
+
+def _mark_used(*paths):
+    """Aggiorna la data di modifica, usata come ordine LRU da 'prune_thumbnails'."""
+    for path in paths:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+
+def prune_thumbnails(cache_dir=THUMBNAIL_DIR, max_bytes=THUMBNAIL_CACHE_MAX_BYTES):
+    """Rimuove le anteprime meno usate di recente finché la cartella rientra in 'max_bytes'."""
+    try:
+        entries = [entry for entry in os.scandir(cache_dir) if entry.is_file()]
+    except OSError:
+        return
+    stats = [(entry.path, entry.stat()) for entry in entries]
+    total = sum(stat.st_size for _, stat in stats)
+    for path, stat in sorted(stats, key=lambda item: item[1].st_mtime):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)  # Un PNG senza il suo JSON (o viceversa) viene semplicemente rigenerato
+        except OSError:
+            continue  # Già rimosso da un altro thread
+        total -= stat.st_size
@@ -1,14 +1,22 @@
 # src/ui_components.py
 
 """
-Modulo per le componenti dell'interfaccia utente (UI), come ToolTip
-e la finestra di editor per i file YAML.
+Modulo per le componenti dell'interfaccia utente (UI), come ToolTip,
+l'albero virtualizzato dei file, il pannello immagini, i visualizzatori a
+pagine (hex, testo e JSON), la finestra di editor per i file YAML e la finestra per la generazione batch.
 """
 
 import customtkinter as ctk
+import mmap
 import os
+import queue
+import threading
 import yaml
-from tkinter import messagebox
+from tkinter import messagebox, ttk
+
+from src.config_model import ConfigModel, ConfigSearchIndex, format_path
+from src.config_schema import format_errors, validate_config
+from src.utils import format_hex_rows, iter_file_pages, iter_json_pages, load_json_document
 
 class ToolTip(ctk.CTkToplevel):
     """Crea un tooltip che appare quando si passa il mouse su un widget."""
@@ -37,8 +45,17 @@ class ToolTip(ctk.CTkToplevel):
         self.widget.bind("<Leave>", self.hide, add="+")
         self.widget.bind("<Button-1>", self.hide, add="+")
 
+    def set_text(self, text):
+        """Aggiorna il testo del tooltip (una stringa vuota lo disattiva)."""
+        self.text = text
+        self.label.configure(text=text)
+        if not text:
+            self.withdraw()
+
     def show(self, event=None):
         """Mostra il tooltip vicino al widget."""
+        if not self.text:
+            return
         self.deiconify()
         x = self.widget.winfo_rootx() + 20
         y = self.widget.winfo_rooty() + self.widget.winfo_height() + 5
@@ -50,8 +67,525 @@ class ToolTip(ctk.CTkToplevel):
         self.withdraw()
 
 
+class _TreeRow:
+    """Widget di una riga riutilizzabile dell'albero virtualizzato."""
+    def __init__(self, frame):
+        self.frame = frame
+        self.var = ctk.IntVar(value=0)
+        self.toggle = None
+        self.label = None
+        self.checkbox = None
+        self.label_tooltip = None
+        self.checkbox_tooltip = None
+        self.path = None
+        self.layout = None
+
+
+class VirtualFileTree(ctk.CTkFrame):
+    """
+    Albero dei file virtualizzato: crea solo le righe che entrano nell'area
+    visibile e le riutilizza durante lo scroll. Struttura, espansione e
+    selezione vivono in un FileTreeModel, non nei widget.
+    """
+    ROW_HEIGHT = 30
+    INDENT = 20
+    MAX_NAME_LEN = 40
+
+    def __init__(self, master, model, on_selection_change=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = model
+        self.on_selection_change = on_selection_change
+        self.first_row = 0
+        self.row_pool = []
+        self.visible_slots = 0
+
+        self.grid_rowconfigure(0, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.message_label = ctk.CTkLabel(self.body, text="", text_color="gray50")
+
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.body)
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel, add="+")
+        widget.bind("<Button-4>", self._on_wheel, add="+")
+        widget.bind("<Button-5>", self._on_wheel, add="+")
+
+    def _create_row(self):
+        frame = ctk.CTkFrame(self.body, fg_color="transparent", corner_radius=0)
+        row = _TreeRow(frame)
+        row.toggle = ctk.CTkButton(frame, text="▶", width=25, fg_color="transparent", text_color=("gray10", "gray90"), command=lambda r=row: self._on_toggle(r))
+        row.label = ctk.CTkLabel(frame, text="", anchor="w")
+        row.checkbox = ctk.CTkCheckBox(frame, text="", variable=row.var, command=lambda r=row: self._on_check(r))
+        row.label_tooltip = ToolTip(row.label, "")
+        row.checkbox_tooltip = ToolTip(row.checkbox, "")
+        for widget in (frame, row.toggle, row.label, row.checkbox):
+            self._bind_wheel(widget)
+        self.row_pool.append(row)
+        return row
+
+    def _truncate(self, text):
+        return (text[:self.MAX_NAME_LEN - 3] + "...") if len(text) > self.MAX_NAME_LEN else text
+
+    def _on_resize(self, event):
+        self.visible_slots = max(1, event.height // self.ROW_HEIGHT + 1)
+        while len(self.row_pool) < self.visible_slots:
+            self._create_row()
+        self.refresh()
+
+    def _max_first_row(self):
+        return max(0, len(self.model.visible_rows()) - self.visible_slots + 1)
+
+    def scroll_to(self, first_row):
+        first_row = max(0, min(int(first_row), self._max_first_row()))
+        if first_row != self.first_row:
+            self.first_row = first_row
+            self.refresh()
+
+    def _on_wheel(self, event):
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_to(self.first_row - 3)
+        else:
+            self.scroll_to(self.first_row + 3)
+
+    def _on_scrollbar(self, *args):
+        total = len(self.model.visible_rows())
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * total)
+        elif args[0] == "scroll":
+            step = self.visible_slots if args[2] == "pages" else 1
+            self.scroll_to(self.first_row + int(args[1]) * step)
+
+    def show_message(self, text):
+        """Nasconde le righe e mostra un messaggio al posto dell'albero."""
+        for row in self.row_pool:
+            row.frame.place_forget()
+        self.message_label.configure(text=text)
+        self.message_label.place(relx=0.5, y=10, anchor="n")
+        self.scrollbar.set(0, 1)
+
+    def refresh(self):
+        """Riassocia le righe del pool ai dati visibili del modello."""
+        self.message_label.place_forget()
+        rows = self.model.visible_rows()
+        self.first_row = max(0, min(self.first_row, self._max_first_row()))
+        for slot, row in enumerate(self.row_pool):
+            index = self.first_row + slot
+            if slot < self.visible_slots and index < len(rows):
+                self._bind_row(row, rows[index], slot)
+            else:
+                row.path = None
+                row.frame.place_forget()
+
+        if rows:
+            self.scrollbar.set(self.first_row / len(rows), min(1.0, (self.first_row + self.visible_slots) / len(rows)))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _bind_row(self, row, data, slot):
+        path, name, depth, is_folder = data
+        row.path = path
+        row.frame.place(x=0, y=slot * self.ROW_HEIGHT, relwidth=1, height=self.ROW_HEIGHT)
+        tooltip_text = name if len(name) > self.MAX_NAME_LEN else ""
+
+        layout = (is_folder, depth)
+        if row.layout != layout:
+            for widget in (row.toggle, row.label, row.checkbox):
+                widget.pack_forget()
+            if is_folder:
+                row.toggle.pack(side="left", padx=(depth * self.INDENT, 5))
+                row.label.pack(side="left", fill="x", expand=True)
+            else:
+                row.checkbox.pack(fill="x", padx=(depth * self.INDENT + 30, 5), pady=2)
+            row.layout = layout
+
+        if is_folder:
+            row.toggle.configure(text="▼" if self.model.is_expanded(path) else "▶")
+            row.label.configure(text=f"📁  {self._truncate(name)}")
+            row.label_tooltip.set_text(tooltip_text)
+        else:
+            row.checkbox.configure(text=f"  📄 {self._truncate(name)}")
+            row.var.set(1 if self.model.is_selected(path) else 0)
+            row.checkbox_tooltip.set_text(tooltip_text)
+
+    def _on_toggle(self, row):
+        if row.path is not None:
+            self.model.toggle_expanded(row.path)
+            self.refresh()
+
+    def _on_check(self, row):
+        if row.path is not None:
+            self.model.set_selected(row.path, row.var.get() == 1)
+            if self.on_selection_change:
+                self.on_selection_change()
+
+
+class ImagePanel(ctk.CTkFrame):
+    """
+    Pannello che mostra un'immagine adattata alle proprie dimensioni.
+    La miniatura viene preparata in un thread di background tramite una
+    ThumbnailCache e ricalcolata solo quando il pannello viene ridimensionato.
+    """
+    RESIZE_DELAY_MS = 120
+
+    def __init__(self, master, image_path, thumbnail_cache, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.image_path = image_path
+        self.thumbnail_cache = thumbnail_cache
+        self.pack_propagate(False)
+        self.label = ctk.CTkLabel(self, text="", text_color="gray60")
+        self.label.pack(padx=10, pady=10, expand=True)
+        self._target_size = None
+        self._resize_job = None
+        self._request_id = 0
+        self.bind("<Configure>", self._on_configure)
+
+    def _on_configure(self, event):
+        size = (event.width - 20, event.height - 20)
+        if size[0] <= 1 or size[1] <= 1 or size == self._target_size:
+            return
+        self._target_size = size
+        if self._resize_job is not None:
+            self.after_cancel(self._resize_job)
+        self._resize_job = self.after(self.RESIZE_DELAY_MS, self._request_thumbnail)
+
+    def _request_thumbnail(self):
+        self._resize_job = None
+        self._request_id += 1
+        request_id, (width, height) = self._request_id, self._target_size
+
+        def work():
+            try:
+                result, error = self.thumbnail_cache.get(self.image_path, width, height), None
+            except Exception as e:
+                result, error = None, e
+            self.after(0, self._show, request_id, result, error)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def _show(self, request_id, thumbnail, error):
+        if request_id != self._request_id or not self.winfo_exists():
+            return  # Risultato superato da un ridimensionamento più recente
+        if error is not None:
+            self.label.configure(image=None, text=f"Errore caricamento immagine:\n{error}")
+            return
+        ctk_image = ctk.CTkImage(light_image=thumbnail, dark_image=thumbnail, size=thumbnail.size)
+        self.label.configure(image=ctk_image, text="")
+
+
+class HexViewer(ctk.CTkFrame):
+    """
+    Visualizzatore hex a pagine per file binari di grandi dimensioni.
+    Il file viene mappato in memoria e nel textbox è presente solo una finestra
+    di righe formattate, che scorre caricando pagine nuove e scartando le più lontane.
+    """
+    BYTES_PER_ROW = 16
+    PAGE_ROWS = 256
+    MAX_WINDOW_ROWS = 4096
+
+    def __init__(self, master, file_path, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.file_size = os.path.getsize(file_path)
+        self.total_rows = -(-self.file_size // self.BYTES_PER_ROW)
+        self._file = open(file_path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.file_size else b""
+        self.first_row = 0
+        self.end_row = 0
+        self._loading = False
+
+        toolbar = ctk.CTkFrame(self, fg_color="transparent")
+        toolbar.pack(fill="x", pady=(0, 5))
+        self.offset_entry = ctk.CTkEntry(toolbar, placeholder_text="Offset (es. 0x1F00)", width=180)
+        self.offset_entry.pack(side="left")
+        self.offset_entry.bind("<Return>", self._on_goto)
+        ctk.CTkButton(toolbar, text="Vai", width=60, command=self._on_goto).pack(side="left", padx=5)
+        self.info_label = ctk.CTkLabel(toolbar, text="", text_color="gray60")
+        self.info_label.pack(side="right")
+
+        self.textbox = ctk.CTkTextbox(self, font=("Consolas", 12), wrap="none")
+        self.textbox.pack(expand=True, fill="both")
+        self.textbox._textbox.configure(yscrollcommand=self._on_yscroll)
+        self.bind("<Destroy>", self._on_destroy, add="+")
+
+        self.goto_row(0)
+
+    def _format_rows(self, start_row, end_row):
+        start = start_row * self.BYTES_PER_ROW
+        end = min(end_row * self.BYTES_PER_ROW, self.file_size)
+        return format_hex_rows(self._data[start:end], start, self.BYTES_PER_ROW)
+
+    def _update_info(self):
+        self.info_label.configure(text=f"Righe {self.first_row + 1}-{self.end_row} di {self.total_rows} ({self.file_size} byte)")
+
+    def goto_row(self, row):
+        """Ricarica la finestra a partire dalla pagina che contiene 'row'."""
+        row = max(0, min(row, max(0, self.total_rows - 1)))
+        self.first_row = (row // self.PAGE_ROWS) * self.PAGE_ROWS
+        self.end_row = min(self.total_rows, self.first_row + self.PAGE_ROWS)
+        self.textbox.configure(state="normal")
+        self.textbox.delete("1.0", "end")
+        self.textbox.insert("1.0", self._format_rows(self.first_row, self.end_row))
+        self.textbox.configure(state="disabled")
+        self.textbox.yview(row - self.first_row)
+        self._update_info()
+
+    def _on_goto(self, event=None):
+        text = self.offset_entry.get().strip()
+        try:
+            offset = int(text, 0)
+        except ValueError:
+            self.info_label.configure(text=f"Offset non valido: {text}")
+            return
+        self.goto_row(offset // self.BYTES_PER_ROW)
+
+    def _on_yscroll(self, first, last):
+        self.textbox._y_scrollbar.set(first, last)
+        if self._loading:
+            return
+        if float(last) > 0.9 and self.end_row < self.total_rows:
+            self._loading = True
+            self.after_idle(self._load_next_page)
+        elif float(first) < 0.1 and self.first_row > 0:
+            self._loading = True
+            self.after_idle(self._load_previous_page)
+
+    def _top_line(self):
+        return int(self.textbox.index("@0,0").split('.')[0])
+
+    def _load_next_page(self):
+        try:
+            new_end = min(self.total_rows, self.end_row + self.PAGE_ROWS)
+            self.textbox.configure(state="normal")
+            self.textbox.insert("end", "\n" + self._format_rows(self.end_row, new_end))
+            self.end_row = new_end
+            if self.end_row - self.first_row > self.MAX_WINDOW_ROWS:
+                # Scarta la pagina più in alto mantenendo ferma la vista
+                top_line = self._top_line()
+                self.textbox.delete("1.0", f"{self.PAGE_ROWS + 1}.0")
+                self.first_row += self.PAGE_ROWS
+                self.textbox.yview(top_line - 1 - self.PAGE_ROWS)
+            self.textbox.configure(state="disabled")
+            self._update_info()
+        finally:
+            self._loading = False
+
+    def _load_previous_page(self):
+        try:
+            new_first = max(0, self.first_row - self.PAGE_ROWS)
+            added_rows = self.first_row - new_first
+            top_line = self._top_line()
+            self.textbox.configure(state="normal")
+            self.textbox.insert("1.0", self._format_rows(new_first, self.first_row) + "\n")
+            self.first_row = new_first
+            if self.end_row - self.first_row > self.MAX_WINDOW_ROWS:
+                # Scarta la pagina più in basso
+                self.end_row -= self.PAGE_ROWS
+                self.textbox.delete(f"{self.end_row - self.first_row}.end", "end")
+            self.textbox.configure(state="disabled")
+            self.textbox.yview(top_line - 1 + added_rows)
+            self._update_info()
+        finally:
+            self._loading = False
+
+    def _on_destroy(self, event):
+        if event.widget is self and self._file is not None:
+            if isinstance(self._data, mmap.mmap):
+                self._data.close()
+            self._file.close()
+            self._file = None
+
+
+class JsonTreeView(ctk.CTkFrame):
+    """
+    Albero comprimibile per un documento JSON già caricato. I nodi figli vengono
+    inseriti solo quando l'utente espande il nodo, a blocchi di CHILD_BATCH elementi.
+    """
+    CHILD_BATCH = 500
+    PREVIEW_LEN = 80
+
+    def __init__(self, master, document, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self._nodes = {}      # id del nodo -> valore JSON (solo per i contenitori)
+        self._more = {}       # id del nodo "mostra altri" -> (id padre, valore del padre, indice di partenza)
+
+        self.tree = ttk.Treeview(self, columns=("value",), show="tree headings")
+        self.tree.heading("#0", text="Chiave")
+        self.tree.heading("value", text="Valore")
+        self.tree.column("#0", width=250, stretch=False)
+        scrollbar = ctk.CTkScrollbar(self, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side="left", expand=True, fill="both")
+        scrollbar.pack(side="right", fill="y")
+        self.tree.bind("<<TreeviewOpen>>", self._on_open)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+
+        self._insert_children("", document, 0)
+
+    def _preview(self, value):
+        if isinstance(value, dict):
+            return f"{{...}} {len(value)} chiavi"
+        if isinstance(value, list):
+            return f"[...] {len(value)} elementi"
+        text = repr(value) if isinstance(value, str) else str(value)
+        return text if len(text) <= self.PREVIEW_LEN else text[:self.PREVIEW_LEN - 3] + "..."
+
+    def _insert_node(self, parent, key, value):
+        node = self.tree.insert(parent, "end", text=str(key), values=(self._preview(value),))
+        if isinstance(value, (dict, list)) and value:
+            self._nodes[node] = value
+            self.tree.insert(node, "end", text="...")  # segnaposto per mostrare la freccia
+        return node
+
+    def _insert_children(self, parent, value, start):
+        items = list(value.items()) if isinstance(value, dict) else list(enumerate(value))
+        end = min(len(items), start + self.CHILD_BATCH)
+        for key, child in items[start:end]:
+            self._insert_node(parent, key, child)
+        if end < len(items):
+            more = self.tree.insert(parent, "end", text=f"(mostra altri {len(items) - end} elementi)")
+            self._more[more] = (parent, value, end)
+
+    def _on_open(self, event=None):
+        node = self.tree.focus()
+        value = self._nodes.pop(node, None)
+        if value is not None:
+            self.tree.delete(*self.tree.get_children(node))
+            self._insert_children(node, value, 0)
+
+    def _on_select(self, event=None):
+        node = self.tree.focus()
+        if node in self._more:
+            parent, value, start = self._more.pop(node)
+            self.tree.delete(node)
+            self._insert_children(parent, value, start)
+
+
+class TextViewer(ctk.CTkFrame):
+    """
+    Visualizzatore di testo e JSON. Lettura, parsing e riformattazione avvengono
+    in un thread di background che produce pagine di testo; il widget le inserisce
+    in modo incrementale fino a un limite di caratteri, estendibile su richiesta.
+    Per i documenti JSON è disponibile anche una vista ad albero.
+    """
+    MAX_CHARS = 2 * 1024 * 1024
+    PAGES_PER_TICK = 4
+
+    def __init__(self, master, file_path, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.file_path = file_path
+        self.char_limit = self.MAX_CHARS
+        self.materialized = 0
+        self.document = None
+        self._pages = queue.Queue(maxsize=8)
+        self._stop = threading.Event()
+        self._finished = False
+
+        self.toolbar = ctk.CTkFrame(self, fg_color="transparent")
+        self.toolbar.pack(fill="x", pady=(0, 5))
+        self.mode_selector = ctk.CTkSegmentedButton(self.toolbar, values=["Testo", "Albero JSON"], command=self._on_mode_change)
+        self.mode_selector.set("Testo")
+        self.info_label = ctk.CTkLabel(self.toolbar, text="Caricamento...", text_color="gray60")
+        self.info_label.pack(side="right")
+        self.more_button = ctk.CTkButton(self.toolbar, text="Mostra altro", width=110, command=self._on_show_more)
+
+        self.textbox = ctk.CTkTextbox(self, font=("Consolas", 12), wrap="none", state="disabled")
+        self.textbox.pack(expand=True, fill="both")
+        self.tree_view = None
+        self.bind("<Destroy>", self._on_destroy, add="+")
+
+        threading.Thread(target=self._produce_pages, daemon=True).start()
+        self.after(30, self._drain_pages)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._pages.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce_pages(self):
+        """Eseguito nel thread di background."""
+        try:
+            is_json, document = load_json_document(self.file_path)
+            if is_json:
+                self.document = document
+                pages = iter_json_pages(document)
+            else:
+                pages = iter_file_pages(self.file_path)
+            for page in pages:
+                if not self._put(page):
+                    return
+        except Exception as e:
+            self._put(f"Errore lettura file: {e}")
+        self._put(None)
+
+    def _drain_pages(self):
+        if not self.winfo_exists():
+            return
+        inserted = 0
+        while inserted < self.PAGES_PER_TICK and self.materialized < self.char_limit:
+            try:
+                page = self._pages.get_nowait()
+            except queue.Empty:
+                break
+            if page is None:
+                self._finished = True
+                break
+            self.textbox.configure(state="normal")
+            self.textbox.insert("end", page)
+            self.textbox.configure(state="disabled")
+            self.materialized += len(page)
+            inserted += 1
+
+        if self.document is not None and not self.mode_selector.winfo_ismapped():
+            self.mode_selector.pack(side="left")
+
+        if self._finished:
+            self.more_button.pack_forget()
+            self.info_label.configure(text=f"{self.materialized} caratteri")
+        elif self.materialized >= self.char_limit:
+            # Limite raggiunto: il thread resta in attesa finché l'utente non chiede altro
+            self.info_label.configure(text=f"Mostrati {self.materialized} caratteri")
+            self.more_button.pack(side="right", padx=5)
+        else:
+            self.info_label.configure(text=f"Caricamento... {self.materialized} caratteri")
+            self.after(30, self._drain_pages)
+
+    def _on_show_more(self):
+        self.char_limit += self.MAX_CHARS
+        self.more_button.pack_forget()
+        self._drain_pages()
+
+    def _on_mode_change(self, mode):
+        if mode == "Albero JSON":
+            if self.tree_view is None:
+                self.tree_view = JsonTreeView(self, self.document)
+            self.textbox.pack_forget()
+            self.tree_view.pack(expand=True, fill="both")
+        else:
+            if self.tree_view is not None:
+                self.tree_view.pack_forget()
+            self.textbox.pack(expand=True, fill="both")
+
+    def _on_destroy(self, event):
+        if event.widget is self:
+            self._stop.set()
+
+
 class YamlEditorWindow(ctk.CTkToplevel):
-    """Una finestra per modificare un file YAML, con funzione di ricerca e scroll."""
+    """
+    Una finestra per modificare un file YAML, con funzione di ricerca.
+    L'albero inserisce i nodi solo quando una sezione viene espansa e usa un
+    unico campo di testo, posizionato sulla riga che si sta modificando.
+    """
+    MAX_SEARCH_RESULTS = 200
+
     def __init__(self, master, yaml_data, file_path):
         super().__init__(master)
         self.transient(master)
@@ -59,13 +593,18 @@ class YamlEditorWindow(ctk.CTkToplevel):
         self.title("Editor Configurazione YAML")
         self.geometry("800x700")
 
-        self.yaml_data = yaml_data
+        self.model = ConfigModel(yaml_data)
         self.file_path = file_path
-        self.widgets = {}
-        self.search_map = []
+        self.search_index = ConfigSearchIndex(self.model)
         self.search_results = []
         self.current_search_index = -1
-        self.last_highlighted_widget = None
+        self._last_query = ""
+        self._result_paths = {}  # id della riga nei risultati -> percorso nel modello
+        self._paths = {}         # id del nodo -> percorso nel modello
+        self._unloaded = set()   # contenitori i cui figli non sono ancora stati inseriti
+        self._editor = None
+        self._editing = None
+        self._scroll_first = None  # Ultima posizione verticale dell'albero
 
         # Frame principale
         main_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -76,10 +615,26 @@ class YamlEditorWindow(ctk.CTkToplevel):
         # Frame per la ricerca
         self._create_search_frame(main_frame)
 
-        # Frame scrollabile per i parametri
-        self.scrollable_frame = ctk.CTkScrollableFrame(main_frame, label_text="Parametri di Configurazione")
-        self.scrollable_frame.grid(row=1, column=0, columnspan=2, sticky="nsew", pady=(0, 10))
-        self.widgets = self._build_ui_recursive(self.scrollable_frame, self.yaml_data)
+        # Albero dei parametri
+        tree_frame = ctk.CTkFrame(main_frame, fg_color="transparent")
+        tree_frame.grid(row=1, column=0, columnspan=2, sticky="nsew", pady=(0, 10))
+        self.tree = ttk.Treeview(tree_frame, columns=("value",), show="tree headings")
+        self.tree.heading("#0", text="Parametro")
+        self.tree.heading("value", text="Valore (doppio clic per modificare)")
+        self.tree.column("#0", width=300, stretch=False)
+        self.tree.tag_configure("modified", foreground="#E67E22")
+        self.tree_scrollbar = ctk.CTkScrollbar(tree_frame, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+        self.tree.pack(side="left", expand=True, fill="both")
+        self.tree_scrollbar.pack(side="right", fill="y")
+        self.tree.bind("<<TreeviewOpen>>", lambda e: self._load_children(self.tree.focus()))
+        self.tree.bind("<Double-1>", self._on_double_click)
+        self.tree.bind("<Return>", lambda e: self._start_edit(self.tree.focus()))
+        # Il campo di modifica è posizionato sulla riga: va chiuso quando la vista si sposta
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>", "<Configure>"):
+            self.tree.bind(sequence, lambda e: self._finish_edit(), add="+")
+
+        self._insert_children("", ())
 
         # Pulsanti di azione
         self._create_action_buttons(main_frame)
@@ -89,103 +644,160 @@ class YamlEditorWindow(ctk.CTkToplevel):
         search_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 10))
         search_frame.grid_columnconfigure(0, weight=1)
 
-        self.search_entry = ctk.CTkEntry(search_frame, placeholder_text="Cerca parametro...")
+        self.search_entry = ctk.CTkEntry(search_frame, placeholder_text="Cerca parametro o valore...")
         self.search_entry.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
-        self.search_entry.bind("<Return>", self._perform_search)
+        self.search_entry.bind("<KeyRelease>", self._on_search_changed)
+        self.search_entry.bind("<Return>", lambda e: self._perform_search(find_next=True))
 
         ctk.CTkButton(search_frame, text="Cerca", width=100, command=self._perform_search).grid(row=0, column=1, padx=(0,5), pady=5)
         ctk.CTkButton(search_frame, text="Trova Succ.", width=100, command=lambda: self._perform_search(find_next=True)).grid(row=0, column=2, padx=(0,5), pady=5)
         self.search_status_label = ctk.CTkLabel(search_frame, text="", width=120)
         self.search_status_label.grid(row=0, column=3, padx=5, pady=5)
 
+        # Elenco dei risultati con i percorsi completi, visibile solo durante una ricerca
+        self.results_list = ttk.Treeview(search_frame, columns=("value",), show="tree", height=6)
+        self.results_list.column("#0", width=380, stretch=False)
+        self.results_list.grid(row=1, column=0, columnspan=4, sticky="ew", padx=5, pady=(0, 5))
+        self.results_list.grid_remove()
+        self.results_list.bind("<<TreeviewSelect>>", self._on_result_selected)
+
     def _create_action_buttons(self, parent):
         ctk.CTkButton(parent, text="Salva e Chiudi", command=self.save_and_close).grid(row=2, column=0, padx=(0, 5), pady=(5,0), sticky="ew")
         ctk.CTkButton(parent, text="Annulla", command=self.destroy, fg_color="gray50", hover_color="gray40").grid(row=2, column=1, padx=(5, 0), pady=(5,0), sticky="ew")
 
-    def _build_ui_recursive(self, parent, data_node, indent=0):
-        if isinstance(data_node, dict):
-            widget_dict = {}
-            for key, value in data_node.items():
-                frame = ctk.CTkFrame(parent, fg_color="transparent")
-                frame.pack(fill="x", anchor="w", padx=(indent * 20, 0))
-                label = ctk.CTkLabel(frame, text=f"{key}:", font=ctk.CTkFont(weight="bold"))
-                label.pack(side="top", anchor="w", pady=(5, 2))
-                self.search_map.append(label)
-                widget_dict[key] = self._build_ui_recursive(frame, value, indent + 1)
-            return widget_dict
-        elif isinstance(data_node, list):
-            widget_list = []
-            for i, item in enumerate(data_node):
-                frame = ctk.CTkFrame(parent, fg_color="transparent")
-                frame.pack(fill="x", anchor="w", padx=(indent * 20, 0))
-                label = ctk.CTkLabel(frame, text=f"- Elemento {i}", text_color="gray60")
-                label.pack(side="top", anchor="w", pady=(5, 0))
-                widget_list.append(self._build_ui_recursive(frame, item, indent + 1))
-            return widget_list
-        else:
-            entry = ctk.CTkEntry(parent, width=400)
-            entry.pack(fill="x", expand=True, pady=(0, 5), padx=(indent * 10, 10))
-            if data_node is not None:
-                entry.insert(0, str(data_node))
-            return entry
+    def _row_text(self, path):
+        if self.model.is_container(path):
+            node = self.model.get(path)
+            return f"{{...}} {len(node)} chiavi" if isinstance(node, dict) else f"[...] {len(node)} elementi"
+        return self.model.value_text(path)
 
-    def _perform_search(self, event=None, find_next=False):
-        query = self.search_entry.get().lower()
-        if not query:
+    def _insert_children(self, parent, path):
+        for key, child_path in self.model.children(path):
+            node_id = format_path(child_path)
+            label = f"- Elemento {key}" if isinstance(key, int) else f"{key}:"
+            tags = ("modified",) if self.model.is_modified(child_path) else ()
+            self.tree.insert(parent, "end", iid=node_id, text=label, values=(self._row_text(child_path),), tags=tags)
+            self._paths[node_id] = child_path
+            if self.model.is_container(child_path) and self.model.children(child_path):
+                self._unloaded.add(node_id)
+                self.tree.insert(node_id, "end", text="...")  # segnaposto per mostrare la freccia
+
+    def _load_children(self, node_id):
+        if node_id in self._unloaded:
+            self._unloaded.discard(node_id)
+            self.tree.delete(*self.tree.get_children(node_id))
+            self._insert_children(node_id, self._paths[node_id])
+
+    def reveal(self, path):
+        """Inserisce ed espande i nodi necessari, poi seleziona e mostra 'path'."""
+        for depth in range(1, len(path)):
+            node_id = format_path(path[:depth])
+            self._load_children(node_id)
+            self.tree.item(node_id, open=True)
+        node_id = format_path(path)
+        self.tree.selection_set(node_id)
+        self.tree.focus(node_id)
+        self.tree.see(node_id)
+
+    def _on_double_click(self, event):
+        node_id = self.tree.identify_row(event.y)
+        if node_id:
+            self._start_edit(node_id)
+            return "break"
+
+    def _start_edit(self, node_id):
+        """Posiziona il campo di modifica sulla colonna valore della riga."""
+        self._finish_edit()
+        path = self._paths.get(node_id)
+        if path is None or self.model.is_container(path):
             return
+        self.tree.see(node_id)
+        self.tree.update_idletasks()
+        bbox = self.tree.bbox(node_id, "value")
+        if not bbox:
+            return
+        if self._editor is None:
+            self._editor = ttk.Entry(self.tree)
+            self._editor.bind("<Return>", lambda e: self._finish_edit())
+            # Il clic su un altro widget conferma la modifica senza riportare lì il focus
+            self._editor.bind("<FocusOut>", lambda e: self._finish_edit(refocus=False))
+            self._editor.bind("<Escape>", lambda e: self._finish_edit(commit=False))
+        x, y, width, height = bbox
+        self._editor.delete(0, "end")
+        self._editor.insert(0, self.model.value_text(path))
+        self._editor.place(x=x, y=y, width=width, height=height)
+        self._editor.focus_set()
+        self._editor.select_range(0, "end")
+        self._editing = node_id
 
-        if self.last_highlighted_widget and self.last_highlighted_widget.winfo_exists():
-            self.last_highlighted_widget.configure(fg_color="transparent")
+    def _on_tree_scroll(self, first, last):
+        """yscrollcommand dell'albero: intercetta ogni scorrimento, anche dalla barra."""
+        self.tree_scrollbar.set(first, last)
+        if self._editing is not None and first != self._scroll_first:
+            self._finish_edit()
+        self._scroll_first = first
 
-        if not find_next or query != getattr(self, "_last_query", None):
-            self.search_results = [w for w in self.search_map if query in w.cget("text").lower()]
-            self.current_search_index = -1
-            self.search_status_label.configure(text=f"Trovati: {len(self.search_results)}")
-            self._last_query = query
+    def _finish_edit(self, commit=True, refocus=True):
+        node_id, self._editing = self._editing, None
+        if node_id is None:
+            return
+        if commit:
+            path = self._paths[node_id]
+            self.model.set_text(path, self._editor.get())
+            self.search_index.update(path)
+            self.tree.item(node_id, values=(self.model.value_text(path),),
+                           tags=("modified",) if self.model.is_modified(path) else ())
+        self._editor.place_forget()
+        if refocus:
+            self.tree.focus_set()
 
-        if not self.search_results:
-            self.search_status_label.configure(text="Nessun risultato")
+    def _on_search_changed(self, event=None):
+        """Aggiorna l'elenco dei risultati a ogni tasto, interrogando solo l'indice."""
+        if event is not None and event.keysym in ("Return", "Up", "Down"):
+            return
+        query = self.search_entry.get()
+        if query == self._last_query:
             return
+        self._last_query = query
+        self.search_results = self.search_index.search(query)
+        self.current_search_index = -1
 
-        self.current_search_index = (self.current_search_index + 1) % len(self.search_results)
-        target_widget = self.search_results[self.current_search_index]
-        target_widget.configure(fg_color=("#F9E79F", "#6E6E6E"))
-        self.last_highlighted_widget = target_widget
-        self.scroll_to_widget(target_widget)
+        self.results_list.delete(*self.results_list.get_children())
+        self._result_paths = {}
+        if not query.strip():
+            self.search_status_label.configure(text="")
+            self.results_list.grid_remove()
+            return
+        for path in self.search_results[:self.MAX_SEARCH_RESULTS]:
+            value = "" if self.model.is_container(path) else self.model.value_text(path)
+            node_id = self.results_list.insert("", "end", text=format_path(path), values=(value,))
+            self._result_paths[node_id] = path
+        self.results_list.grid()
+        self.search_status_label.configure(text=f"Trovati: {len(self.search_results)}" if self.search_results else "Nessun risultato")
 
-    def scroll_to_widget(self, widget):
-        """Scrolla la vista per rendere visibile il widget."""
-        def _do_scroll():
-            self.scrollable_frame.update_idletasks()
-            try:
-                content_height = self.scrollable_frame._parent_canvas.bbox("all")[3]
-                if content_height <= 0: return
-                widget_y = widget.master.winfo_y()
-                scroll_fraction = max(0.0, widget_y / content_height - 0.05)
-                self.scrollable_frame._parent_canvas.yview_moveto(scroll_fraction)
-            except Exception as e:
-                print(f"Non è stato possibile eseguire lo scroll: {e}")
-        self.after(100, _do_scroll)
-
-    def _rebuild_data_recursive(self, widget_node, original_data_node):
-        if isinstance(widget_node, dict):
-            return {key: self._rebuild_data_recursive(sub_widget, original_data_node[key]) for key, sub_widget in widget_node.items()}
-        if isinstance(widget_node, list):
-            return [self._rebuild_data_recursive(sub_widget, original_data_node[i]) for i, sub_widget in enumerate(widget_node)]
-        
-        value_str = widget_node.get()
-        original_type = type(original_data_node)
-        try:
-            if original_type is bool: return value_str.lower() in ['true', '1', 't', 'y', 'yes']
-            if original_data_node is None: return None if value_str.lower() == 'none' else value_str
-            return original_type(value_str)
-        except (ValueError, TypeError):
-            return value_str
+    def _perform_search(self, event=None, find_next=False):
+        self._on_search_changed()
+        if not self.search_results:
+            return
+        self.current_search_index = (self.current_search_index + 1) % len(self.search_results) if find_next else 0
+        self.reveal(self.search_results[self.current_search_index])
+
+    def _on_result_selected(self, event=None):
+        node_id = self.results_list.focus()
+        if node_id in self._result_paths:
+            self.reveal(self._result_paths[node_id])
 
     def save_and_close(self):
         """Salva i dati modificati nel file YAML e chiude la finestra."""
         try:
-            new_data = self._rebuild_data_recursive(self.widgets, self.yaml_data)
+            self._finish_edit()
+            new_data = self.model.to_data()
+            errors = validate_config(new_data)
+            if errors:
+                messagebox.showerror("Configurazione non valida", f"Correggere i valori indicati prima di salvare:\n\n{format_errors(errors)}", parent=self)
+                if errors[0][0]:
+                    self.reveal(errors[0][0])
+                return
             with open(self.file_path, 'w', encoding='utf-8') as f:
                 yaml.dump(new_data, f, default_flow_style=False, sort_keys=False, allow_unicode=True)
             messagebox.showinfo("Successo", f"File '{os.path.basename(self.file_path)}' salvato correttamente.")
@@ -193,4 +805,38 @@ class YamlEditorWindow(ctk.CTkToplevel):
                 self.master.update_status(f"Configurazione '{os.path.basename(self.file_path)}' aggiornata.")
             self.destroy()
         except Exception as e:
-            messagebox.showerror("Errore di Salvataggio", f"Impossibile salvare il file di configurazione:\n{e}")
\ No newline at end of file
+            messagebox.showerror("Errore di Salvataggio", f"Impossibile salvare il file di configurazione:\n{e}")
+
+
+class BatchDialog(ctk.CTkToplevel):
+    """Una finestra per definire una generazione batch tramite una specifica YAML."""
+    def __init__(self, master, initial_text, on_submit):
+        super().__init__(master)
+        self.transient(master)
+        self.title("Generazione Batch")
+        self.geometry("600x500")
+        self.on_submit = on_submit
+
+        main_frame = ctk.CTkFrame(self, fg_color="transparent")
+        main_frame.pack(expand=True, fill="both", padx=10, pady=10)
+        main_frame.grid_rowconfigure(1, weight=1)
+        main_frame.grid_columnconfigure((0, 1), weight=1)
+
+        ctk.CTkLabel(main_frame, text="Specifica del batch (YAML)", font=ctk.CTkFont(weight="bold")).grid(row=0, column=0, columnspan=2, sticky="w", pady=(0, 5))
+        self.spec_textbox = ctk.CTkTextbox(main_frame, font=("Consolas", 12), wrap="none")
+        self.spec_textbox.grid(row=1, column=0, columnspan=2, sticky="nsew", pady=(0, 10))
+        self.spec_textbox.insert("1.0", initial_text)
+
+        ctk.CTkButton(main_frame, text="Avvia Batch", command=self._submit).grid(row=2, column=0, padx=(0, 5), sticky="ew")
+        ctk.CTkButton(main_frame, text="Annulla", command=self.destroy, fg_color="gray50", hover_color="gray40").grid(row=2, column=1, padx=(5, 0), sticky="ew")
+
+    def _submit(self):
+        try:
+            spec = yaml.safe_load(self.spec_textbox.get("1.0", "end"))
+            if not isinstance(spec, dict):
+                raise ValueError("La specifica deve essere un dizionario YAML.")
+        except (yaml.YAMLError, ValueError) as e:
+            messagebox.showerror("Specifica non valida", f"Impossibile leggere la specifica del batch:\n{e}", parent=self)
+            return
+        self.on_submit(spec)
+        self.destroy()
\ No newline at end of file
@@ -2,71 +2,258 @@
 
 """
 Modulo contenente funzioni di utilità, come il visualizzatore Open3D
-e strumenti di formattazione.
+e strumenti di formattazione (hexdump, testo e JSON a pagine).
+Open3D e NumPy non vengono importati al caricamento del modulo: Open3D solo
+nel processo visualizzatore, NumPy al primo hexdump o nel processo figlio,
+così l'avvio dell'interfaccia non ne paga il costo.
 """
 
-import open3d as o3d
-import numpy as np
+import functools
+import json
 import multiprocessing
+import queue
+import time
 
-def _visualizer_process_target(file_path):
+from src.config import POINTCLOUD_LOD_METHOD, POINTCLOUD_PREVIEW_BUDGET
+
+
+def _load_point_cloud_arrays(file_path):
+    """Carica un file .npy o .pcd e restituisce gli array (points, colors)."""
+    import numpy as np
+    import open3d as o3d
+    from src.pointcloud import load_npy_point_cloud
+
+    file_ext = file_path.lower().split('.')[-1]
+
+    if file_ext == 'npy':
+        points, colors, stats = load_npy_point_cloud(file_path)
+        print(f"[Processo Open3D] Caricati {stats['points']} punti in {stats['load_s']:.3f} s")
+    elif file_ext == 'pcd':
+        pcd = o3d.io.read_point_cloud(file_path)
+        points = np.asarray(pcd.points)
+        colors = np.asarray(pcd.colors) if pcd.has_colors() else None
+    else:
+        raise ValueError(f"Formato file non supportato: {file_ext}")
+
+    if len(points) == 0:
+        raise ValueError("La nuvola di punti è vuota.")
+    return points, colors
+
+
+def _make_point_cloud(points, colors, indices=None):
+    """Crea una PointCloud di Open3D, eventualmente solo con i punti indicati."""
+    import open3d as o3d
+
+    if indices is not None:
+        points = points[indices]
+        colors = colors[indices] if colors is not None else None
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(points)
+    if colors is not None:
+        pcd.colors = o3d.utility.Vector3dVector(colors)
+    return pcd
+
+
+def _viewer_worker_target(request_queue):
     """
-    Funzione target per il processo di visualizzazione.
-    CARICA il file e AVVIA il visualizzatore.
-    Questa funzione viene eseguita nel suo processo separato.
+    Funzione target del processo visualizzatore persistente.
+    Mantiene una sola finestra Visualizer e, a ogni richiesta ricevuta sulla
+    coda, mostra prima un'anteprima sottocampionata entro il budget di punti e
+    poi la raffina per livelli fino alla risoluzione piena. 'None' chiude il
+    processo. Se l'utente chiude la finestra, la successiva richiesta la riapre.
     """
-    try:
-        # Tutta la logica di caricamento è stata spostata qui,
-        # all'interno del processo figlio.
-        file_ext = file_path.lower().split('.')[-1]
-        pcd = o3d.geometry.PointCloud()
+    import open3d as o3d
+    from src.pointcloud import downsample_indices, lod_levels
+
+    vis = None
+    current_geometry = None
+    pending = None  # nuvola in corso di visualizzazione e livelli di dettaglio ancora da mostrare
+    while True:
+        try:
+            # Senza finestra aperta si resta in attesa; altrimenti si controlla la coda senza bloccare
+            request = request_queue.get() if vis is None else request_queue.get(timeout=1 / 60)
+        except queue.Empty:
+            request = ()
+        if request is None:
+            break
+
+        if request:
+            file_path, budget, method = request
+            try:
+                start = time.perf_counter()
+                points, colors = _load_point_cloud_arrays(file_path)
+                pending = {
+                    "points": points, "colors": colors, "levels": lod_levels(len(points), budget),
+                    "method": method, "start": start, "reset_view": True
+                }
+                if vis is None:
+                    vis = o3d.visualization.Visualizer()
+                    vis.create_window(window_name="Open3D")
+            except Exception as e:
+                # L'errore verrà stampato nella console del processo figlio
+                print(f"[Processo Open3D] Errore durante la visualizzazione: {e}")
+                pending = None
 
-        if file_ext == 'npy':
-            numpy_array = np.load(file_path, allow_pickle=True)
-            if not isinstance(numpy_array, np.ndarray) or numpy_array.ndim != 2:
-                raise ValueError("Il file .npy non contiene un array 2D valido.")
+        elif pending is not None:
+            # Nessuna nuova richiesta: si mostra il livello di dettaglio successivo
+            level = pending["levels"].pop(0)
+            is_full = not pending["levels"]
+            points, colors = pending["points"], pending["colors"]
+            indices = None if is_full else downsample_indices(points, level, pending["method"])
+            pcd = _make_point_cloud(points, colors, indices)
+            if current_geometry is not None:
+                vis.remove_geometry(current_geometry, reset_bounding_box=False)
+            # La vista si adatta solo alla prima geometria di un file, non ai raffinamenti
+            vis.add_geometry(pcd, reset_bounding_box=pending["reset_view"])
+            pending["reset_view"] = False
+            current_geometry = pcd
+            label = "completa" if is_full else "anteprima"
+            print(f"[Processo Open3D] Vista {label}: {len(pcd.points)} punti in {time.perf_counter() - pending['start']:.3f} s")
+            if is_full:
+                pending = None
 
-            points = numpy_array[:, :3]
-            pcd.points = o3d.utility.Vector3dVector(points)
+        if vis is not None:
+            if not vis.poll_events():
+                vis.destroy_window()
+                vis, current_geometry, pending = None, None, None
+                continue
+            vis.update_renderer()
 
-            if numpy_array.shape[1] >= 6:
-                colors = numpy_array[:, 3:6]
-                if np.max(colors) > 1.0:
-                    colors = colors / 255.0
-                pcd.colors = o3d.utility.Vector3dVector(colors)
+    if vis is not None:
+        vis.destroy_window()
+
+
+class Open3DViewerWorker:
+    """
+    Processo visualizzatore Open3D a lunga vita. Viene avviato alla prima
+    richiesta e riceve i percorsi dei file da mostrare tramite una coda:
+    open3d viene importato una sola volta e la finestra viene riutilizzata.
+    """
+    def __init__(self, preview_budget=POINTCLOUD_PREVIEW_BUDGET, lod_method=POINTCLOUD_LOD_METHOD):
+        self.preview_budget = preview_budget
+        self.lod_method = lod_method
+        self._process = None
+        self._queue = None
 
-        elif file_ext == 'pcd':
-            pcd = o3d.io.read_point_cloud(file_path)
-        else:
-            raise ValueError(f"Formato file non supportato: {file_ext}")
+    def show(self, file_path):
+        """Mostra il file nella finestra del visualizzatore, avviandolo se necessario."""
+        if self._process is None or not self._process.is_alive():
+            self._queue = multiprocessing.Queue()
+            self._process = multiprocessing.Process(target=_viewer_worker_target, args=(self._queue,), daemon=True)
+            self._process.start()
+        self._queue.put((file_path, self.preview_budget, self.lod_method))
 
-        if not pcd.has_points():
-            raise ValueError("La nuvola di punti è vuota.")
+    def shutdown(self, timeout=2.0):
+        """Chiude il processo visualizzatore, forzandone la terminazione se non risponde."""
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            self._queue.put(None)
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join(timeout)
+        self._queue.close()
+        self._process, self._queue = None, None
 
-        # Infine, visualizza i dati caricati
-        o3d.visualization.draw_geometries([pcd])
 
-    except Exception as e:
-        # L'errore verrà stampato nella console del processo figlio
-        print(f"[Processo Open3D] Errore durante la visualizzazione: {e}")
+@functools.lru_cache(maxsize=None)
+def _hex_tables():
+    """Tabelle per il formatter hex vettorizzato, create al primo utilizzo."""
+    import numpy as np
+    hex_digits = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+    printable = np.array([b if 32 <= b < 127 else ord('.') for b in range(256)], dtype=np.uint8)
+    return hex_digits, printable
 
 
-def start_open3d_process(file_path):
+def format_hex_rows(data, start_offset=0, length=16):
     """
-    Crea e avvia un processo separato per il visualizzatore Open3D.
-    Passiamo solo il 'file_path' (una semplice stringa), che è facilmente
-    serializzabile ("pickleable").
+    Formatta i dati binari in righe hexdump (stesso formato di 'format_hex_dump').
+    Le righe complete vengono composte in un'unica matrice di byte con NumPy,
+    senza cicli Python per riga; 'start_offset' è l'offset del primo byte.
     """
-    process = multiprocessing.Process(target=_visualizer_process_target, args=(file_path,))
-    process.start()
+    import numpy as np
+    hex_digits, printable = _hex_tables()
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    full_rows = len(buffer) // length
+    hex_start = 10
+    text_start = hex_start + 3 * length + 2
+    row_width = text_start + length + 3  # "|testo|" + a capo
+
+    lines = []
+    if full_rows:
+        matrix = np.full((full_rows, row_width), ord(' '), dtype=np.uint8)
+        offsets = start_offset + np.arange(full_rows, dtype=np.int64) * length
+        for digit in range(8):
+            matrix[:, digit] = hex_digits[(offsets >> (4 * (7 - digit))) & 0xF]
+        block = buffer[:full_rows * length].reshape(full_rows, length)
+        matrix[:, hex_start:hex_start + 3 * length:3] = hex_digits[block >> 4]
+        matrix[:, hex_start + 1:hex_start + 3 * length:3] = hex_digits[block & 0xF]
+        matrix[:, text_start] = ord('|')
+        matrix[:, text_start + 1:text_start + 1 + length] = printable[block]
+        matrix[:, text_start + 1 + length] = ord('|')
+        matrix[:, -1] = ord('\n')
+        lines.append(matrix.tobytes().decode('ascii')[:-1])
+
+    remainder = bytes(buffer[full_rows * length:])
+    if remainder:
+        # Ultima riga incompleta: formattata come nella versione originale
+        offset = start_offset + full_rows * length
+        hex_part = ' '.join(f'{b:02X}' for b in remainder)
+        text_part = ''.join(chr(b) if 32 <= b < 127 else '.' for b in remainder)
+        lines.append(f'{offset:08X}  {hex_part:<{length * 3}}  |{text_part}|')
+    return '\n'.join(lines)
 
 
 def format_hex_dump(data, length=16):
     """Formatta i dati binari in un formato hexdump leggibile."""
-    res = []
-    for i in range(0, len(data), length):
-        chunk = data[i:i + length]
-        hex_part = ' '.join(f'{b:02X}' for b in chunk)
-        text_part = ''.join(chr(b) if 32 <= b < 127 else '.' for b in chunk)
-        res.append(f'{i:08X}  {hex_part:<{length * 3}}  |{text_part}|')
-    return '\n'.join(res)
\ No newline at end of file
+    return format_hex_rows(data, 0, length)
+
+
+# Dimensione (caratteri) delle pagine di testo inviate al visualizzatore
+TEXT_PAGE_CHARS = 64 * 1024
+
+
+def load_json_document(file_path):
+    """
+    Prova a interpretare il file come JSON. Restituisce (True, oggetto) in caso
+    di successo, (False, None) se il file non è JSON; il parsing viene tentato
+    solo se il primo carattere significativo apre un oggetto o una lista.
+    """
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        head = f.read(4096).lstrip()
+        if not head or head[0] not in '{[':
+            return False, None
+        f.seek(0)
+        try:
+            return True, json.load(f)
+        except (json.JSONDecodeError, TypeError):
+            return False, None
+
+
+def _group_pages(chunks, page_chars):
+    page, size = [], 0
+    for chunk in chunks:
+        page.append(chunk)
+        size += len(chunk)
+        if size >= page_chars:
+            yield ''.join(page)
+            page, size = [], 0
+    if page:
+        yield ''.join(page)
+
+
+def iter_json_pages(document, page_chars=TEXT_PAGE_CHARS):
+    """Genera a pagine il JSON riformattato con indentazione, senza costruire la stringa intera."""
+    return _group_pages(json.JSONEncoder(indent=4).iterencode(document), page_chars)
+
+
+def iter_file_pages(file_path, page_chars=TEXT_PAGE_CHARS):
+    """Genera a pagine il contenuto testuale del file, leggendolo a blocchi."""
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        while True:
+            page = f.read(page_chars)
+            if not page:
+                break
+            yield page
@@ -0,0 +1,94 @@
+# startup_benchmark.py
+
+"""
+Benchmark dell'avvio dell'interfaccia: misura, in processi Python separati,
+il tempo di import di main.py e il tempo fino alla prima finestra visibile
+(dall'avvio del processo), e lo confronta con il budget stabilito.
+Riporta anche quali moduli pesanti sono già stati caricati in quei momenti:
+open3d, numpy e requests devono essere importati solo al primo utilizzo.
+
+    python startup_benchmark.py [--runs 5]
+
+Termina con codice 1 se la mediana supera il budget.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+IMPORT_BUDGET_S = 0.5
+FIRST_WINDOW_BUDGET_S = 1.5
+DEFERRED_MODULES = ("open3d", "numpy", "requests", "src.pointcloud", "src.network")
+
+
+def _loaded(modules):
+    return [name for name in modules if name in sys.modules]
+
+
+def run_child():
+    """Eseguito nel processo figlio: importa main, crea la finestra e stampa le misure in JSON."""
+    start = time.perf_counter()
+    import main
+    result = {"import_s": time.perf_counter() - start, "deferred_at_import": _loaded(DEFERRED_MODULES)}
+    try:
+        app = main.App()
+        while not app.winfo_viewable():
+            app.update()
+        result["window_at"] = time.time()
+        result["deferred_at_window"] = _loaded(DEFERRED_MODULES)
+        app.destroy()
+    except Exception as e:  # es. nessun display disponibile
+        result["window_error"] = str(e)
+    print(json.dumps(result), flush=True)
+    os._exit(0)  # Evita di attendere i thread di background (listing)
+
+
+def measure_once():
+    started_at = time.time()
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    lines = [line for line in output.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        raise RuntimeError(f"Il processo di misura non ha prodotto risultati:\n{output.stderr}")
+    result = json.loads(lines[-1])
+    if "window_at" in result:
+        result["first_window_s"] = result["window_at"] - started_at
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        run_child()
+
+    results = [measure_once() for _ in range(max(1, args.runs))]
+    import_times = [r["import_s"] for r in results]
+    import_median = statistics.median(import_times)
+    within_budget = import_median <= IMPORT_BUDGET_S
+    print(f"Import di main.py:   mediana {import_median * 1000:.0f} ms, max {max(import_times) * 1000:.0f} ms "
+          f"(budget {IMPORT_BUDGET_S * 1000:.0f} ms)")
+    print(f"  moduli differiti già caricati all'import: {results[-1]['deferred_at_import'] or 'nessuno'}")
+
+    window_times = [r["first_window_s"] for r in results if "first_window_s" in r]
+    if window_times:
+        window_median = statistics.median(window_times)
+        within_budget = within_budget and window_median <= FIRST_WINDOW_BUDGET_S
+        print(f"Prima finestra:      mediana {window_median * 1000:.0f} ms, max {max(window_times) * 1000:.0f} ms "
+              f"(budget {FIRST_WINDOW_BUDGET_S * 1000:.0f} ms, dall'avvio del processo)")
+        print(f"  moduli differiti già caricati alla prima finestra: {results[-1]['deferred_at_window'] or 'nessuno'}")
+    else:
+        print(f"Prima finestra:      non misurabile ({results[-1].get('window_error')})")
+
+    print("Esito: " + ("entro il budget." if within_budget else "BUDGET SUPERATO."))
+    return 0 if within_budget else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())